@@ -0,0 +1,82 @@
+"""
+Startup time of the pymechturk packages.
+
+Run from the repository root:
+    python -m benchmarks.startup                          # print the import times
+    python -m benchmarks.startup --save startup.json      # store the baseline
+    python -m benchmarks.startup --compare startup.json   # exit with 1 if any import regressed
+
+Every import runs in a fresh interpreter and its cumulative time is taken from the -X importtime report, so the
+interpreter start is not counted. The check also fails if importing a package loads one of the heavy modules, they
+should be imported on the first use of the public names.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+IMPORTS = ("pymechturk.qualification", "pymechturk.requester")
+
+# The modules which should not be loaded by importing the packages
+HEAVY_MODULES = ("boto3", "botocore", "xml.etree.ElementTree", "xml.dom.minidom", "sqlite3", "asyncio",
+                 "concurrent.futures", "http.server", "dataclasses")
+
+
+def measure(module: str, repeat: int) -> float:
+    """The best cumulative import time of the module in a fresh interpreter in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        report = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                check=True, capture_output=True, text=True).stderr
+        # import time: self [us] | cumulative | imported package
+        for line in report.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                best = min(best, int(fields[1]) / 1e6)
+    return best
+
+
+def loaded_heavy_modules(module: str) -> List[str]:
+    statement = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", statement], check=True, capture_output=True, text=True).stdout
+    modules = set(output.split())
+    return [name for name in HEAVY_MODULES if name in modules]
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="Save the results as the baseline JSON file")
+    parser.add_argument("--compare", help="Compare the results with the baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed relative slowdown, 0.5 by default")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of interpreter starts per import")
+    args = parser.parse_args(argv)
+
+    failures: List[str] = list()
+    results: Dict[str, Dict[str, float]] = dict()
+    for module in IMPORTS:
+        seconds = measure(module, args.repeat)
+        results[module] = {"seconds": seconds}
+        print(f"{module:<45} {seconds * 1e3:>10.3f} ms")
+        for heavy in loaded_heavy_modules(module):
+            failures.append(f"importing {module} loads {heavy}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline: Dict[str, Dict[str, float]] = json.load(file)
+        for module, result in results.items():
+            previous = baseline.get(module, {}).get("seconds")
+            # The changes below a millisecond are noise
+            if previous is not None and result["seconds"] > max(previous * (1 + args.threshold), previous + 1e-3):
+                failures.append(f"{module}: {previous * 1e3:.3f} ms -> {result['seconds'] * 1e3:.3f} ms")
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+"""
+Benchmarks of the XML generator and serialization paths.
+
+Run from the repository root:
+    python -m benchmarks.xml_generator                          # print the results
+    python -m benchmarks.xml_generator --save baseline.json     # store the baseline
+    python -m benchmarks.xml_generator --compare baseline.json  # exit with 1 if any case regressed
+
+Every case is timed with the best of several repeats and its peak memory is measured with tracemalloc in a separate
+run, so the tracing overhead does not affect the timings.
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from typing import Dict, Callable, List, Tuple
+
+from pymechturk.qualification.xml_generator import Content, Question, QuestionForm, AnswerKey, SelectionAnswer,\
+    FreeTextAnswer, question_id_scope
+
+SIZES = {
+    "small": 5,
+    "medium": 100,
+    "huge": 2000,
+}
+
+
+def build_content(index: int) -> Content:
+    return Content() \
+        .add_title(f"Question {index}") \
+        .add_text("Look at the image and choose the best description of the scene. " * 3) \
+        .add_image(f"http://example.com/images/{index}.jpg", alt_text="The scene") \
+        .add_list([f"Hint {i} & details <b>" for i in range(5)])
+
+
+def build_question(index: int) -> Question:
+    if index % 2:
+        answer = SelectionAnswer({f"option_{i}": f"Option {i}" for i in range(6)}, answer_style="radiobutton")
+    else:
+        answer = FreeTextAnswer(min_length=2, max_length=50, default_text="none")
+    return Question(build_content(index), answer, name=f"Question {index}", is_required=True)
+
+
+def build_form(size: int) -> QuestionForm:
+    form = QuestionForm()
+    with question_id_scope(form.question_ids):
+        form.add_overview(Content().add_title("Instructions").add_list([f"Rule {i}" for i in range(10)]))
+        for i in range(size):
+            form.add_question(build_question(i))
+    return form
+
+
+def build_answer_key(size: int) -> AnswerKey:
+    key = AnswerKey()
+    with question_id_scope():
+        for i in range(size):
+            question = Question(Content().add_text("q"), SelectionAnswer({"a": "A", "b": "B", "c": "C"}))
+            key.add_question_keys(question, {10: ["a"], 5: ["b", "c"]})
+    return key.add_max_score(10 * size)
+
+
+def cases() -> Dict[str, Callable[[], object]]:
+    result: Dict[str, Callable[[], object]] = dict()
+    for name, size in SIZES.items():
+        form = build_form(size)
+        result[f"content/{name}"] = lambda size=size: [build_content(i) for i in range(size)]
+        result[f"question/{name}"] = lambda size=size: [build_question(i) for i in range(size)]
+        result[f"form/{name}"] = lambda size=size: build_form(size)
+        result[f"answer_key/{name}"] = lambda size=size: build_answer_key(size)
+        for formatted in (True, False):
+            for url_safe in (False, True):
+                label = f"to_string/{'formatted' if formatted else 'compact'}{'/url_safe' if url_safe else ''}/{name}"
+                result[label] = lambda form=form, f=formatted, u=url_safe: form.to_string(formatted=f, url_safe=u)
+            label = f"to_bytes/{'formatted' if formatted else 'compact'}/{name}"
+            result[label] = lambda form=form, f=formatted: form.to_bytes(formatted=f)
+        result[f"to_canonical/{name}"] = lambda form=form: form.to_canonical()
+    return result
+
+
+def measure(case: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """The best time of one call in seconds and the peak memory in bytes"""
+    timer = timeit.Timer(case)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    case()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Names of the cases whose time or peak memory grew more than the threshold"""
+    regressions = list()
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if baseline[name][metric] and result[metric] > baseline[name][metric] * (1 + threshold):
+                regressions.append(f"{name} {metric}: {baseline[name][metric]:.6g} -> {result[metric]:.6g}")
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="Save the results as the baseline JSON file")
+    parser.add_argument("--compare", help="Compare the results with the baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown, 0.2 by default")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing repeats")
+    parser.add_argument("--filter", default="", help="Run only the cases containing the substring")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, float]] = dict()
+    for name, case in cases().items():
+        if args.filter not in name:
+            continue
+        seconds, peak = measure(case, args.repeat)
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+        print(f"{name:<45} {seconds * 1e3:>10.3f} ms {peak / 1024:>12.1f} KiB")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,172 @@
+"""
+Command line of the package, run it as python -m pymechturk.
+
+    python -m pymechturk render form.json rows.csv --output forms.jsonl
+    python -m pymechturk render form.json rows.jsonl --output forms.jsonl --shard-size 100000
+    python -m pymechturk render key.json rows.csv --output-dir keys --file-name "{index:08d}.xml"
+
+The render command compiles the spec (see pymechturk.qualification.spec) into a template and renders it with every
+row of the CSV or JSONL data file by render_many. The rows are read and written lazily and only a bounded number of
+them is in flight, so the memory does not depend on the number of rows.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Optional, Dict, List, Iterator, TextIO
+
+from pymechturk.qualification.batch import render_many, ChunkTiming
+from pymechturk.qualification.spec import load_spec, compile_spec
+
+# The data file formats by the file extension
+DATA_FORMATS = {".csv": "csv", ".tsv": "tsv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def read_rows(path: str, data_format: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """
+    Read the rows of the data file lazily.
+
+    Args:
+        path (str): The CSV file with the header line, the TSV file or the JSONL file of objects. '-' reads stdin
+        data_format (Optional[str]): One of 'csv', 'tsv' or 'jsonl'. If None it is taken from the file extension
+
+    Returns:
+        Iterator[Dict[str, str]]: The rows as {column: value}, the JSON values which are not strings are converted
+            by str and the nulls become empty strings
+    """
+    data_format = data_format or DATA_FORMATS.get(os.path.splitext(path)[1].lower())
+    assert data_format in DATA_FORMATS.values(), \
+        f"Unknown format of the data file {path}, it should be one of {sorted(set(DATA_FORMATS.values()))}"
+    file = sys.stdin if path == "-" else \
+        open(path, "r", encoding="utf-8", newline="" if data_format != "jsonl" else None)
+    try:
+        if data_format == "jsonl":
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                assert isinstance(row, dict), f"The line {number} of {path} should be a JSON object"
+                yield {k: v if isinstance(v, str) else "" if v is None else str(v) for k, v in row.items()}
+        else:
+            yield from csv.DictReader(file, dialect="excel-tab" if data_format == "tsv" else "excel")
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+class _JSONLWriter(object):
+    """Writes {"index": ..., "xml": ...} lines into one file or into the shards of shard_size lines"""
+
+    def __init__(self, path: str, shard_size: Optional[int]):
+        self.path = path
+        self.shard_size = shard_size
+        self.paths: List[str] = list()
+        self._file: Optional[TextIO] = None
+        self._written = 0
+
+    def write(self, index: int, xml: str):
+        if self._file is None or (self.shard_size and self._written == self.shard_size):
+            self._open_next()
+        self._file.write(json.dumps({"index": index, "xml": xml}, ensure_ascii=False) + "\n")
+        self._written += 1
+
+    def _open_next(self):
+        self.close()
+        if self.path == "-":
+            self._file = sys.stdout
+        else:
+            root, extension = os.path.splitext(self.path)
+            path = f"{root}-{len(self.paths):05d}{extension or '.jsonl'}" if self.shard_size else self.path
+            self._file = open(path, "w", encoding="utf-8")
+            self.paths.append(path)
+        self._written = 0
+
+    def close(self):
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        self._file = None
+
+
+class _Progress(object):
+    """Prints the number of the rendered rows and the throughput every interval seconds"""
+
+    def __init__(self, interval: float, file: TextIO):
+        self.interval = interval
+        self.file = file
+        self.rows = 0
+        self._start = time.monotonic()
+        self._reported = self._start
+
+    def on_chunk(self, timing: ChunkTiming):
+        self.rows += timing.size
+        now = time.monotonic()
+        if self.interval and now - self._reported >= self.interval:
+            self._report(now, "rendered")
+            self._reported = now
+
+    def finish(self):
+        self._report(time.monotonic(), "done")
+
+    def _report(self, now: float, status: str):
+        seconds = now - self._start
+        throughput = self.rows / seconds if seconds else 0.0
+        print(f"{status}: {self.rows} rows in {seconds:.1f} s, {throughput:.0f} rows/s", file=self.file, flush=True)
+
+
+def render(args: argparse.Namespace) -> int:
+    assert (args.output is None) != (args.output_dir is None), "Exactly one of --output or --output-dir is needed"
+    assert args.shard_size is None or args.output, "--shard-size is used with --output only"
+    template = compile_spec(load_spec(args.spec), args.root_name, url_safe=args.url_safe,
+                            formatted=not args.compact, indent=args.indent)
+    progress = _Progress(args.progress_interval, sys.stderr)
+    results = render_many(read_rows(args.data, args.format), template, pool=args.pool, max_workers=args.workers,
+                          chunk_size=args.chunk_size, output_dir=args.output_dir, file_name=args.file_name,
+                          on_chunk=progress.on_chunk)
+    if args.output_dir:
+        for _ in results:
+            pass
+    else:
+        writer = _JSONLWriter(args.output, args.shard_size)
+        try:
+            for index, xml in enumerate(results):
+                writer.write(index, xml)
+        finally:
+            writer.close()
+    progress.finish()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pymechturk", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("render", help="Render the form spec with every row of the data file")
+    command.add_argument("spec", help="The JSON spec of the QuestionForm or AnswerKey")
+    command.add_argument("data", help="The CSV, TSV or JSONL file of the rows, '-' reads stdin")
+    command.add_argument("--format", choices=sorted(set(DATA_FORMATS.values())),
+                         help="The format of the data file, taken from its extension by default")
+    command.add_argument("--output", help="The JSONL file of the rendered XML, '-' writes stdout")
+    command.add_argument("--shard-size", type=int, help="Split the JSONL output into the files of this many rows")
+    command.add_argument("--output-dir", help="Write every rendered XML into its own file in the directory")
+    command.add_argument("--file-name", default="{index}.xml", help="The file name template of --output-dir")
+    command.add_argument("--root-name", help="The name of the XML tree root")
+    command.add_argument("--compact", action="store_true", help="Render the XML without indentation")
+    command.add_argument("--url-safe", action="store_true", help="Encode the XML for using it in the URL")
+    command.add_argument("--indent", type=int, default=4, help="Number of spaces for one level of the indentation")
+    command.add_argument("--pool", choices=["process", "thread"], default="process", help="The type of the pool")
+    command.add_argument("--workers", type=int, help="Number of workers, the number of CPUs by default")
+    command.add_argument("--chunk-size", type=int, default=1000, help="Number of rows sent to the worker at once")
+    command.add_argument("--progress-interval", type=float, default=5.0,
+                         help="The interval of the progress reports in seconds, 0 reports the end only")
+    command.set_defaults(handler=render)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except (AssertionError, KeyError, OSError, ValueError) as error:
+        print(f"error: {error.args[0] if isinstance(error, KeyError) else error}", file=sys.stderr)
+        return 1
@@ -1,6 +1,8 @@
 import csv
 import json
-from typing import Dict
+import os
+from threading import Lock
+from typing import Dict, Tuple, ClassVar
 from dataclasses import dataclass, field
 
 
@@ -22,8 +24,19 @@ class Sandbox(Environment):
     preview = "https://workersandbox.mturk.com/mturk/preview"
 
 
+@dataclass(frozen=True)
+class Local(Environment):
+    """The local stand-in server, see pymechturk.requester.local_server.LocalMTurkServer.environment"""
+    endpoint: str = "http://127.0.0.1:8765"
+    preview: str = "http://127.0.0.1:8765/preview"
+
+
 @dataclass
 class AmazonIAMUser(object):
+    # The modification time, the size and the credentials by the file path, so the changed file is read again
+    _CREDENTIALS: ClassVar[Dict[str, Tuple[Tuple[int, int], Dict[str, str]]]] = dict()
+    _CREDENTIALS_LOCK: ClassVar[Lock] = Lock()
+
     def __init__(self):
         self.user_name: str = field(default_factory=str)
         self.password: str = field(default_factory=str)
@@ -32,13 +45,20 @@ class AmazonIAMUser(object):
         self.console_login_link: str = field(default_factory=str)
 
     def from_file(self, file_path: str) -> "AmazonIAMUser":
+        """Load the credentials from the CSV or JSON file, the file is parsed once until it changes"""
         extension = file_path.split('.')[-1]
-        if extension == "csv":
-            credentials = self._load_csv(file_path)
-        elif extension == "json":
-            credentials = self._load_json(file_path)
-        else:
+        if extension not in ("csv", "json"):
             raise Exception("Unknown file extension")
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._CREDENTIALS_LOCK:
+            cached = self._CREDENTIALS.get(path)
+            if cached is not None and cached[0] == version:
+                credentials = cached[1]
+            else:
+                credentials = self._load_csv(file_path) if extension == "csv" else self._load_json(file_path)
+                self._CREDENTIALS[path] = (version, credentials)
         self._update_fields(credentials)
         return self
 
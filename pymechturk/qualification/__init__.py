@@ -1,3 +1,73 @@
-from pymechturk.qualification.data_classes import QualificationType
-from pymechturk.qualification.xml_generator import XMLWrapper, Content, Question, Answer, SelectionAnswer,\
-    FreeTextAnswer, AnswerKey, QuestionForm
+"""
+The public names are imported on first use, so importing the package does not load the XML generator, the
+validation and their dependencies until they are used.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "QualificationType": "pymechturk.qualification.data_classes",
+    "XMLWrapper": "pymechturk.qualification.xml_generator",
+    "Content": "pymechturk.qualification.xml_generator",
+    "Question": "pymechturk.qualification.xml_generator",
+    "Answer": "pymechturk.qualification.xml_generator",
+    "SelectionAnswer": "pymechturk.qualification.xml_generator",
+    "FreeTextAnswer": "pymechturk.qualification.xml_generator",
+    "AnswerKey": "pymechturk.qualification.xml_generator",
+    "QuestionForm": "pymechturk.qualification.xml_generator",
+    "QuestionFormWriter": "pymechturk.qualification.xml_generator",
+    "Slot": "pymechturk.qualification.xml_generator",
+    "IDAllocator": "pymechturk.qualification.xml_generator",
+    "question_id_scope": "pymechturk.qualification.xml_generator",
+    "SizeLimitExceeded": "pymechturk.qualification.xml_generator",
+    "Template": "pymechturk.qualification.template",
+    "build_from_spec": "pymechturk.qualification.spec",
+    "compile_spec": "pymechturk.qualification.spec",
+    "FragmentCache": "pymechturk.qualification.cache",
+    "SelectionCoding": "pymechturk.qualification.coding",
+    "AnswerKeyScorer": "pymechturk.qualification.scoring",
+    "QuestionFormAnswersParser": "pymechturk.qualification.answers",
+    "AnswerColumns": "pymechturk.qualification.answers",
+    "Judgments": "pymechturk.qualification.aggregation",
+    "Consensus": "pymechturk.qualification.aggregation",
+    "GoldAccuracy": "pymechturk.qualification.aggregation",
+    "majority_vote": "pymechturk.qualification.aggregation",
+    "dawid_skene": "pymechturk.qualification.aggregation",
+    "gold_accuracy": "pymechturk.qualification.aggregation",
+    "validate_question_form": "pymechturk.qualification.validation",
+    "validate_answer_key": "pymechturk.qualification.validation",
+    "Instrumentation": "pymechturk.qualification.instrumentation",
+    "OperationStats": "pymechturk.qualification.instrumentation",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from pymechturk.qualification.data_classes import QualificationType
+    from pymechturk.qualification.xml_generator import XMLWrapper, Content, Question, Answer, SelectionAnswer,\
+        FreeTextAnswer, AnswerKey, QuestionForm, QuestionFormWriter, Slot, IDAllocator, question_id_scope,\
+        SizeLimitExceeded
+    from pymechturk.qualification.template import Template
+    from pymechturk.qualification.spec import build_from_spec, compile_spec
+    from pymechturk.qualification.cache import FragmentCache
+    from pymechturk.qualification.coding import SelectionCoding
+    from pymechturk.qualification.scoring import AnswerKeyScorer
+    from pymechturk.qualification.answers import QuestionFormAnswersParser, AnswerColumns
+    from pymechturk.qualification.aggregation import Judgments, Consensus, GoldAccuracy, majority_vote, dawid_skene,\
+        gold_accuracy
+    from pymechturk.qualification.validation import validate_question_form, validate_answer_key
+    from pymechturk.qualification.instrumentation import Instrumentation, OperationStats
+
+
+def __getattr__(name: str):
+    """Import the public name on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
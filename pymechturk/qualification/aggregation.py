@@ -0,0 +1,329 @@
+"""
+Aggregation of the SelectionAnswer judgments of many workers: majority vote, Dawid-Skene consensus and the accuracy
+of the workers on the gold questions of the AnswerKey.
+
+The judgments of one question are integer coded: the item, the worker and the chosen option of every judgment are
+stored in three aligned arrays. The algorithms work on whole columns: the judgments are sorted by item and by
+(worker, option) once, the values of the judgments are gathered by itemgetter and every sum over a group is the
+difference of the running sums at the group bounds, so the Python loops run over the items and the workers, not over
+the judgments. NumPy is not a dependency of the package, the columns are the standard arrays and lists.
+
+    columns = QuestionFormAnswersParser(form).parse(answers)
+    judgments = Judgments.from_columns(columns, "animal", worker_ids, hit_ids)
+    consensus = dawid_skene(judgments)
+    labels = consensus.label_ids()
+"""
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import accumulate, compress, repeat
+from math import exp, log
+from operator import add, sub, mul, truediv, itemgetter
+from typing import Optional, List, Dict, Iterable, Sequence, Tuple, Union, Callable
+
+from pymechturk.qualification.answers import AnswerColumns
+from pymechturk.qualification.scoring import AnswerKeyScorer
+from pymechturk.qualification.xml_generator import AnswerKey
+
+
+@dataclass
+class Judgments(object):
+    """The judgments of one question: workers[j] chose the option labels[j] for the item items[j]"""
+    item_ids: List[str]
+    worker_ids: List[str]
+    option_ids: List[str]
+    items: array = field(default_factory=lambda: array("q"))
+    workers: array = field(default_factory=lambda: array("q"))
+    labels: array = field(default_factory=lambda: array("q"))
+    # The answers without a selection or with several selections
+    skipped: int = 0
+
+    def __len__(self):
+        """Get number of judgments"""
+        return len(self.labels)
+
+    @classmethod
+    def from_columns(cls, columns: AnswerColumns,
+                     question_id: str,
+                     worker_ids: Sequence[str],
+                     item_ids: Sequence[str]) -> "Judgments":
+        """
+        Collect the judgments of the question from the parsed answers.
+
+        Args:
+            columns (AnswerColumns): The parsed answers, one row per assignment
+            question_id (str): The single selection question
+            worker_ids (Sequence[str]): The worker of every row
+            item_ids (Sequence[str]): The item of every row, e.g. the HIT identifier
+
+        Returns:
+            Judgments: The judgments, the rows without exactly one known selection are skipped
+        """
+        assert len(worker_ids) == columns.rows and len(item_ids) == columns.rows, \
+            f"Expected {columns.rows} worker and item identifiers, received {len(worker_ids)} and {len(item_ids)}"
+        option_ids = columns.coding.selection_ids(question_id)
+        assert option_ids, f"Question '{question_id}' has no selections"
+        # The masks of one selection, the others are skipped
+        options = {1 << i: i for i in range(len(option_ids))}
+        labels = list(map(options.get, columns.selection_column(question_id)))
+        answered = [label is not None for label in labels]
+        judgments = cls._coded(compress(item_ids, answered), compress(worker_ids, answered), option_ids)
+        judgments.labels = array("q", compress(labels, answered))
+        judgments.skipped = columns.rows - len(judgments.labels)
+        return judgments
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, str]], option_ids: Sequence[str]) -> "Judgments":
+        """
+        Collect the judgments from the (item_id, worker_id, selection_id) records.
+
+        Args:
+            records (Iterable[Tuple[str, str, str]]): The judgments
+            option_ids (Sequence[str]): The selection identifiers of the question
+
+        Returns:
+            Judgments: The judgments, the records with unknown selections are skipped
+        """
+        options = {s: i for i, s in enumerate(option_ids)}
+        items: List[str] = list()
+        workers: List[str] = list()
+        labels = array("q")
+        skipped = 0
+        for item_id, worker_id, selection_id in records:
+            label = options.get(selection_id)
+            if label is None:
+                skipped += 1
+                continue
+            items.append(item_id)
+            workers.append(worker_id)
+            labels.append(label)
+        judgments = cls._coded(items, workers, list(option_ids))
+        judgments.labels = labels
+        judgments.skipped = skipped
+        return judgments
+
+    @classmethod
+    def _coded(cls, item_ids: Iterable[str], worker_ids: Iterable[str], option_ids: List[str]) -> "Judgments":
+        item_codes: Dict[str, int] = dict()
+        worker_codes: Dict[str, int] = dict()
+        items = array("q", [item_codes.setdefault(i, len(item_codes)) for i in item_ids])
+        workers = array("q", [worker_codes.setdefault(w, len(worker_codes)) for w in worker_ids])
+        return cls(list(item_codes), list(worker_codes), option_ids, items, workers)
+
+
+@dataclass
+class Consensus(object):
+    item_ids: List[str]
+    option_ids: List[str]
+    # The consensus option of every item and its vote share or posterior probability
+    labels: array
+    confidence: array
+    # The probability of every option per item, one array per option (Dawid-Skene only)
+    posteriors: Optional[List[array]] = None
+    priors: Optional[List[float]] = None
+    worker_ids: Optional[List[str]] = None
+    # The confusion matrices of the workers, confusion[k][w * options + l] is the probability that the worker w
+    # chooses the option l for the item of the option k (Dawid-Skene only)
+    confusion: Optional[List[array]] = None
+    iterations: int = 0
+    log_likelihood: Optional[float] = None
+
+    def label_ids(self) -> Dict[str, str]:
+        """The consensus selection identifier of every item"""
+        return {i: self.option_ids[label] for i, label in zip(self.item_ids, self.labels)}
+
+    def confusion_matrix(self, worker_id: str) -> List[List[float]]:
+        """The estimated probabilities [true option][chosen option] of the worker (Dawid-Skene only)"""
+        assert self.confusion is not None, "The consensus has no worker confusion matrices"
+        size = len(self.option_ids)
+        start = self.worker_ids.index(worker_id) * size
+        return [list(row[start:start + size]) for row in self.confusion]
+
+    def worker_accuracy(self) -> Dict[str, float]:
+        """The estimated probability of the correct answer of every worker (Dawid-Skene only)"""
+        assert self.confusion is not None, "The consensus has no worker confusion matrices"
+        size = len(self.option_ids)
+        return {w: sum(self.priors[k] * self.confusion[k][i * size + k] for k in range(size))
+                for i, w in enumerate(self.worker_ids)}
+
+
+@dataclass
+class GoldAccuracy(object):
+    worker_ids: List[str]
+    # Number of the gold questions answered by every worker and the number of the correct answers
+    answered: array
+    correct: array
+
+    def accuracy(self) -> Dict[str, float]:
+        """The share of the correct answers of every worker"""
+        return {w: c / a if a else 0.0 for w, a, c in zip(self.worker_ids, self.answered, self.correct)}
+
+
+def majority_vote(judgments: Judgments, weights: Optional[Dict[str, float]] = None) -> Consensus:
+    """
+    Choose the option with the most votes for every item, the ties are broken by the order of the options.
+
+    Args:
+        judgments (Judgments): The judgments of one question
+        weights (Optional[Dict[str, float]]): The vote weight of the workers, e.g. their gold accuracy. The workers
+            without weight have 1. If None every vote has the weight 1
+
+    Returns:
+        Consensus: The consensus labels and their vote shares
+    """
+    labels, confidence = _best_options(_votes(judgments, weights))
+    return Consensus(judgments.item_ids, judgments.option_ids, labels, confidence)
+
+
+def dawid_skene(judgments: Judgments,
+                max_iterations: int = 50,
+                tolerance: float = 1e-6,
+                smoothing: float = 0.01) -> Consensus:
+    """
+    Estimate the true option of every item and the confusion matrix of every worker by the Dawid-Skene
+    expectation-maximization, starting from the majority vote.
+
+    Args:
+        judgments (Judgments): The judgments of one question
+        max_iterations (int): The maximum number of the EM iterations
+        tolerance (float): Stop when the log-likelihood per item improves less than the tolerance
+        smoothing (float): The pseudo-count added to every cell of the confusion matrices and to the priors, so the
+            options never seen from a worker keep a small probability
+
+    Returns:
+        Consensus: The consensus labels, their posterior probabilities, the option priors and the confusion matrices
+    """
+    assert len(judgments), "There are no judgments"
+    size = len(judgments.option_ids)
+    item_count = len(judgments.item_ids)
+    # The judgment codes worker * size + label, grouped by item and by the code
+    codes = list(map(add, map(mul, judgments.workers, repeat(size)), judgments.labels))
+    by_item = sorted(range(len(codes)), key=judgments.items.__getitem__)
+    gather_by_item = _gather(list(map(codes.__getitem__, by_item)))
+    _, item_bounds = _groups(judgments.items)
+    by_code = sorted(range(len(codes)), key=codes.__getitem__)
+    gather_by_code = _gather(list(map(judgments.items.__getitem__, by_code)))
+    distinct_codes, code_bounds = _groups(codes)
+
+    # The vote shares are the starting posteriors
+    votes = _votes(judgments)
+    totals = list(map(sum, zip(*votes)))
+    posteriors = [list(map(truediv, v, totals)) for v in votes]
+    iterations = 0
+    log_likelihood = float("-inf")
+    while True:
+        # M-step: the option priors and the confusion matrices from the posteriors
+        priors = [(sum(p) + smoothing) / (item_count + size * smoothing) for p in posteriors]
+        confusion: List[List[float]] = list()
+        for posterior in posteriors:
+            counts = [smoothing] * (len(judgments.worker_ids) * size)
+            for code, total in zip(distinct_codes, _segment_sums(gather_by_code(posterior), code_bounds)):
+                counts[code] += total
+            for start in range(0, len(counts), size):
+                total = sum(counts[start:start + size])
+                counts[start:start + size] = [c / total for c in counts[start:start + size]]
+            confusion.append(counts)
+        if iterations == max_iterations:
+            break
+        # E-step: the posteriors of the options from the priors and the log-probabilities of the judgments
+        scores = list()
+        for prior, matrix in zip(priors, confusion):
+            logs = list(map(log, matrix))
+            scores.append(list(map(add, _segment_sums(gather_by_item(logs), item_bounds),
+                                   repeat(log(prior)))))
+        highest = list(map(max, *scores)) if size > 1 else scores[0]
+        exponents = [list(map(exp, map(sub, s, highest))) for s in scores]
+        totals = list(map(sum, zip(*exponents)))
+        posteriors = [list(map(truediv, e, totals)) for e in exponents]
+        iterations += 1
+        previous, log_likelihood = log_likelihood, (sum(highest) + sum(map(log, totals))) / item_count
+        if log_likelihood - previous < tolerance:
+            break
+
+    labels, confidence = _best_options(posteriors)
+    return Consensus(judgments.item_ids, judgments.option_ids, labels, confidence,
+                     posteriors=[array("d", p) for p in posteriors], priors=priors, worker_ids=judgments.worker_ids,
+                     confusion=[array("d", c) for c in confusion], iterations=iterations,
+                     log_likelihood=log_likelihood if iterations else None)
+
+
+def gold_accuracy(columns: AnswerColumns,
+                  worker_ids: Sequence[str],
+                  answer_key: Union[AnswerKey, AnswerKeyScorer]) -> GoldAccuracy:
+    """
+    Count the correct answers of every worker on the gold questions, the questions of the answer key. The answer is
+    correct if it gets the highest score of its question.
+
+    Args:
+        columns (AnswerColumns): The parsed answers, one row per assignment
+        worker_ids (Sequence[str]): The worker of every row
+        answer_key (Union[AnswerKey, AnswerKeyScorer]): The answer key of the gold questions or its scorer with the
+            coding of the columns
+
+    Returns:
+        GoldAccuracy: The numbers of the answered and the correct gold questions per worker
+    """
+    assert len(worker_ids) == columns.rows, f"Expected {columns.rows} worker identifiers, received {len(worker_ids)}"
+    scorer = answer_key if isinstance(answer_key, AnswerKeyScorer) else AnswerKeyScorer(answer_key, columns.coding)
+    worker_codes: Dict[str, int] = dict()
+    workers = [worker_codes.setdefault(w, len(worker_codes)) for w in worker_ids]
+    answered = array("q", bytes(8 * len(worker_codes)))
+    correct = array("q", bytes(8 * len(worker_codes)))
+    for question_id, masks in scorer.best_masks().items():
+        column = columns.selection_column(question_id)
+        for worker, count in Counter(compress(workers, column)).items():
+            answered[worker] += count
+        for worker, count in Counter(compress(workers, map(masks.__contains__, column))).items():
+            correct[worker] += count
+    return GoldAccuracy(list(worker_codes), answered, correct)
+
+
+def _votes(judgments: Judgments, weights: Optional[Dict[str, float]] = None) -> List[List[float]]:
+    """The (weighted) votes of every option per item, one list per option"""
+    size = len(judgments.option_ids)
+    codes = map(add, map(mul, judgments.items, repeat(size)), judgments.labels)
+    votes = [0.0] * (len(judgments.item_ids) * size)
+    if weights is None:
+        for code, count in Counter(codes).items():
+            votes[code] = count
+    else:
+        worker_weights = [weights.get(w, 1.0) for w in judgments.worker_ids]
+        for code, weight in zip(codes, map(worker_weights.__getitem__, judgments.workers)):
+            votes[code] += weight
+    return [votes[k::size] for k in range(size)]
+
+
+def _best_options(scores: List[List[float]]) -> Tuple[array, array]:
+    """The option with the highest score of every item and its share of the item total"""
+    labels = array("q")
+    confidence = array("d")
+    for row in zip(*scores):
+        best = max(row)
+        total = sum(row)
+        labels.append(row.index(best))
+        confidence.append(best / total if total else 0.0)
+    return labels, confidence
+
+
+def _groups(keys: Iterable[int]) -> Tuple[List[int], List[int]]:
+    """The distinct keys in the ascending order and the bounds of their groups in the sorted keys"""
+    counts = Counter(keys)
+    distinct = sorted(counts)
+    bounds = [0]
+    bounds.extend(accumulate(map(counts.__getitem__, distinct)))
+    return distinct, bounds
+
+
+def _gather(indices: List[int]) -> Callable[[Sequence[float]], Sequence[float]]:
+    """The function taking the values at the indices in one call"""
+    if len(indices) == 1:
+        return lambda values: (values[indices[0]],)
+    return itemgetter(*indices)
+
+
+def _segment_sums(values: Iterable[float], bounds: List[int]) -> List[float]:
+    """The sums of the groups values[bounds[i]:bounds[i + 1]] as the differences of the running sums"""
+    running = [0.0]
+    running.extend(accumulate(values))
+    return list(map(sub, map(running.__getitem__, bounds[1:]), map(running.__getitem__, bounds[:-1])))
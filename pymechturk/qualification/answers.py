@@ -0,0 +1,117 @@
+"""
+The parser of the QuestionFormAnswers returned with the assignments:
+https://docs.aws.amazon.com/AWSMechTurk/latest/AWSMturkAPI/ApiReference_QuestionFormAnswersDataStructureArticle.html
+
+The answers are parsed into columns, one per question of the QuestionForm: the selections are stored as bit masks of
+the SelectionCoding in compact integer arrays and the texts in the lists aligned with them.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Optional, List, Dict, Iterable, Iterator, Union
+import xml.etree.ElementTree as ET
+
+from pymechturk.qualification.coding import SelectionCoding
+from pymechturk.qualification.xml_generator import QuestionForm
+
+
+@dataclass
+class AnswerColumns(object):
+    coding: SelectionCoding
+    rows: int = 0
+    selections: List[array] = field(default_factory=list)
+    texts: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+
+    def selection_column(self, question_id: str) -> array:
+        """The selection masks of the question, 0 if the question was not answered"""
+        return self.selections[self.coding.question_index(question_id)]
+
+    def text_column(self, question_id: str) -> List[Optional[str]]:
+        """The FreeText or OtherSelectionText answers of the question, None if there is no text"""
+        return self.texts.get(question_id, [None] * self.rows)
+
+
+class QuestionFormAnswersParser(object):
+    """Streaming parser of the QuestionFormAnswers documents of one QuestionForm"""
+
+    TEXT_TAGS = ("FreeText", "OtherSelectionText", "UploadedFileKey")
+
+    def __init__(self, form: Union[QuestionForm, SelectionCoding]):
+        """
+        Create new parser.
+
+        Args:
+            form (Union[QuestionForm, SelectionCoding]): The form the answers are given for or its coding
+        """
+        self.coding = form if isinstance(form, SelectionCoding) else SelectionCoding.from_form(form)
+
+    def parse(self, documents: Iterable[Union[str, bytes]]) -> AnswerColumns:
+        """
+        Parse the answers.
+
+        Args:
+            documents (Iterable[Union[str, bytes]]): QuestionFormAnswers XML documents, one per assignment
+
+        Returns:
+            AnswerColumns: The answers, one row per document
+        """
+        columns = self._empty_columns()
+        for document in documents:
+            self._parse_document(document, columns)
+        self._pad_texts(columns)
+        return columns
+
+    def iter_parse(self, documents: Iterable[Union[str, bytes]], batch_size: int = 100000) -> Iterator[AnswerColumns]:
+        """
+        Parse the answers in batches, the memory is bounded by the batch size.
+
+        Args:
+            documents (Iterable[Union[str, bytes]]): QuestionFormAnswers XML documents, one per assignment
+            batch_size (int): Number of documents in one batch
+
+        Returns:
+            Iterator[AnswerColumns]: The answers of the consecutive batches
+        """
+        iterator = iter(documents)
+        while True:
+            columns = self.parse(islice(iterator, batch_size))
+            if not columns.rows:
+                return
+            yield columns
+
+    def _empty_columns(self) -> AnswerColumns:
+        return AnswerColumns(self.coding, selections=[array("q") for _ in range(len(self.coding))])
+
+    def _parse_document(self, document: Union[str, bytes], columns: AnswerColumns):
+        row = columns.rows
+        for selections in columns.selections:
+            selections.append(0)
+        columns.rows += 1
+
+        parser = ET.XMLPullParser(events=("end",))
+        parser.feed(document)
+        parser.close()
+        question_id: Optional[str] = None
+        index: Optional[int] = None
+        for _, element in parser.read_events():
+            tag = element.tag.rpartition("}")[2]
+            if tag == "QuestionIdentifier":
+                question_id = element.text
+                index = self.coding.question_index(question_id) if question_id in self.coding else None
+            elif tag == "Answer":
+                question_id = index = None
+                element.clear()
+            elif index is None:
+                continue
+            elif tag == "SelectionIdentifier":
+                columns.selections[index][row] |= self.coding.encode(question_id, element.text)
+            elif tag in self.TEXT_TAGS:
+                texts = columns.texts.setdefault(question_id, list())
+                texts.extend([None] * (row + 1 - len(texts)))
+                texts[row] = element.text or ""
+
+    @staticmethod
+    def _pad_texts(columns: AnswerColumns):
+        for texts in columns.texts.values():
+            texts.extend([None] * (columns.rows - len(texts)))
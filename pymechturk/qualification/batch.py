@@ -0,0 +1,148 @@
+"""
+Batch rendering of the XML wrappers over the concurrent.futures pools.
+
+The items are read lazily and only a bounded number of chunks is in flight, so the batch of any size is rendered
+with constant memory.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from itertools import islice
+from typing import Optional, List, Any, Callable, Iterable, Iterator, Union, Tuple
+
+from pymechturk.qualification.xml_generator import XMLWrapper
+from pymechturk.qualification.template import Template
+
+
+@dataclass
+class ChunkTiming(object):
+    index: int
+    size: int
+    seconds: float
+
+
+@dataclass
+class _RenderOptions(object):
+    root_name: Optional[str] = None
+    url_safe: bool = False
+    formatted: bool = True
+    indent: int = 4
+    output_dir: Optional[str] = None
+    file_name: str = "{index}.xml"
+
+
+Builder = Union[Template, Callable[[Any], XMLWrapper], None]
+
+
+def render_many(items: Iterable[Any],
+                builder: Builder = None,
+                root_name: Optional[str] = None,
+                url_safe: bool = False,
+                formatted: bool = True,
+                indent: int = 4,
+                pool: str = "process",
+                max_workers: Optional[int] = None,
+                chunk_size: int = 100,
+                ordered: bool = True,
+                output_dir: Optional[str] = None,
+                file_name: str = "{index}.xml",
+                on_chunk: Optional[Callable[[ChunkTiming], None]] = None) -> Iterator[str]:
+    """
+    Render the items in parallel.
+
+    Args:
+        items (Iterable[Any]): XMLWrapper objects or the specs for the builder. The iterable is consumed lazily
+        builder (Union[Template, Callable, None]): The Template rendered with the spec as slot values or the function
+            creating XMLWrapper from the spec. None if the items are XMLWrapper objects. The process pool needs
+            a picklable builder (module level function or Template)
+        root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+        url_safe (bool): Encode the rendered output for using it in the URL. Ignored for the Template builder
+        formatted (bool): Render indented XML. Ignored for the Template builder
+        indent (int): Number of spaces for one level of the indentation. Ignored for the Template builder
+        pool (str): The type of the pool, one of 'process' or 'thread'
+        max_workers (Optional[int]): Number of workers. If None the pool default is used
+        chunk_size (int): Number of items sent to the worker at once
+        ordered (bool): Yield the results in the order of the items. Otherwise as soon as the chunk is ready
+        output_dir (Optional[str]): Save the results into the directory and yield the file paths instead of XML
+        file_name (str): The file name template, formatted with the item index
+        on_chunk (Optional[Callable[[ChunkTiming], None]]): Called with the timing of every rendered chunk
+
+    Returns:
+        Iterator[str]: Rendered XML strings or the saved file paths
+    """
+    assert pool in ["process", "thread"], f"pool should be one of 'process' or 'thread', received {pool}"
+    assert chunk_size > 0, f"chunk_size should be positive, received {chunk_size}"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    options = _RenderOptions(root_name, url_safe, formatted, indent, output_dir, file_name)
+    executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        results = _stream(executor, items, builder, options, chunk_size, ordered, max_workers or os.cpu_count() or 1)
+        for timing, rendered in results:
+            if on_chunk:
+                on_chunk(timing)
+            yield from rendered
+
+
+def _stream(executor: Executor,
+            items: Iterable[Any],
+            builder: Builder,
+            options: _RenderOptions,
+            chunk_size: int,
+            ordered: bool,
+            workers: int) -> Iterator[Tuple[ChunkTiming, List[str]]]:
+    """Keep at most two chunks per worker in flight"""
+    iterator = iter(items)
+    max_pending = 2 * workers
+    pending: deque = deque()
+    chunk_index = 0
+    exhausted = False
+
+    while True:
+        while not exhausted and len(pending) < max_pending:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                exhausted = True
+                break
+            pending.append(executor.submit(_render_chunk, chunk_index, chunk_index * chunk_size, chunk, builder,
+                                           options))
+            chunk_index += 1
+        if not pending:
+            return
+        if ordered:
+            future: Future = pending.popleft()
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            future = done.pop()
+            pending.remove(future)
+        yield future.result()
+
+
+def _render_chunk(chunk_index: int,
+                  first_item_index: int,
+                  chunk: List[Any],
+                  builder: Builder,
+                  options: _RenderOptions) -> Tuple[ChunkTiming, List[str]]:
+    start = time.perf_counter()
+    results = list()
+    for index, item in enumerate(chunk, first_item_index):
+        path = os.path.join(options.output_dir, options.file_name.format(index=index)) if options.output_dir else None
+        if isinstance(builder, Template):
+            text = builder.render(item)
+            if path:
+                # The same bytes as XMLWrapper.save writes
+                with open(path, "wb") as file:
+                    file.write(text.encode("utf-8"))
+        else:
+            wrapper = builder(item) if builder else item
+            if path:
+                wrapper.save(path, options.root_name, url_safe=options.url_safe, formatted=options.formatted,
+                             indent=options.indent)
+            else:
+                text = wrapper.to_string(options.root_name, url_safe=options.url_safe, formatted=options.formatted,
+                                         indent=options.indent)
+        results.append(path if path else text)
+    return ChunkTiming(chunk_index, len(chunk), time.perf_counter() - start), results
@@ -0,0 +1,74 @@
+"""
+Process-wide cache of the rendered XML fragments.
+
+The fragments are keyed by the structural hash of the element, so identical overviews, contents and answers which
+are repeated across the forms are serialized once per process. The element is kept with its fragment, so the hit is
+checked against the hash collisions.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Hashable, Tuple, Any
+
+
+class FragmentCache(object):
+    """LRU cache of the rendered fragments bounded by the number of entries and the total length"""
+
+    def __init__(self, max_entries: int = 10000, max_chars: Optional[int] = None):
+        """
+        Create new cache.
+
+        Args:
+            max_entries (int): Maximum number of the cached fragments
+            max_chars (Optional[int]): Maximum total length of the cached fragments. If None only the number of the
+                entries is bounded
+        """
+        assert max_entries > 0, f"max_entries should be positive, received {max_entries}"
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._chars = 0
+        self._fragments: "OrderedDict[Hashable, Tuple[Any, str]]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        """Get number of cached fragments"""
+        return len(self._fragments)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, str]]:
+        """Get the element and its fragment, None if the key is not cached"""
+        with self._lock:
+            entry = self._fragments.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, element: Any, fragment: str):
+        if self.max_chars is not None and len(fragment) > self.max_chars:
+            return
+        with self._lock:
+            previous = self._fragments.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous[1])
+            self._fragments[key] = (element, fragment)
+            self._chars += len(fragment)
+            while len(self._fragments) > self.max_entries or \
+                    (self.max_chars is not None and self._chars > self.max_chars):
+                _, evicted = self._fragments.popitem(last=False)
+                self._chars -= len(evicted[1])
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self._chars = 0
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,93 @@
+"""
+Integer coding of the questions and selections of a form.
+
+The questions are numbered in the order of the form, the selections of a question are numbered in the order of its
+SelectionAnswer. The set of selected options is encoded as a bit mask, so single and multiple selections have one
+integer code and the empty mask means no answer.
+"""
+
+from typing import Dict, List, Iterable, Union
+
+from pymechturk.qualification.xml_generator import XMLWrapper, QuestionForm, AnswerKey
+
+
+class SelectionCoding(object):
+    """Integer codes of the questions and selection identifiers"""
+
+    # The highest usable bit marks the selections which are not in the form, so such an answer matches nothing
+    UNKNOWN = 1 << 62
+    MAX_SELECTIONS = 62
+
+    def __init__(self, selections: Dict[str, List[str]]):
+        """
+        Create new coding.
+
+        Args:
+            selections (Dict[str, List[str]]): The ordered dictionary of {question_id: [selection_ids]}
+        """
+        self.question_ids: List[str] = list(selections)
+        self._questions: Dict[str, int] = {q: i for i, q in enumerate(self.question_ids)}
+        self._selection_ids: List[List[str]] = list()
+        self._selections: List[Dict[str, int]] = list()
+        for question_id, ids in selections.items():
+            ids = list(dict.fromkeys(ids))
+            assert len(ids) <= self.MAX_SELECTIONS,\
+                f"Question '{question_id}' has more than {self.MAX_SELECTIONS} selections"
+            self._selection_ids.append(ids)
+            self._selections.append({s: 1 << i for i, s in enumerate(ids)})
+
+    def __len__(self):
+        """Get number of questions"""
+        return len(self.question_ids)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._questions
+
+    @classmethod
+    def from_form(cls, form: QuestionForm) -> "SelectionCoding":
+        """The coding of all questions of the form, the free text questions have no selections"""
+        return cls(cls._collect(form, "Question", "AnswerSpecification/SelectionAnswer/Selections/Selection"))
+
+    @classmethod
+    def from_answer_key(cls, answer_key: AnswerKey) -> "SelectionCoding":
+        """The coding of the selections referenced in the answer key"""
+        return cls(cls._collect(answer_key, "Question", "AnswerOption"))
+
+    @staticmethod
+    def _collect(wrapper: XMLWrapper, question_path: str, selection_path: str) -> Dict[str, List[str]]:
+        selections: Dict[str, List[str]] = dict()
+        for question in wrapper.compile_elements().iterfind(question_path):
+            ids = selections.setdefault(question.findtext("QuestionIdentifier"), list())
+            for selection in question.iterfind(selection_path):
+                ids.extend(e.text for e in selection.iterfind("SelectionIdentifier"))
+        return selections
+
+    def question_index(self, question_id: str) -> int:
+        return self._questions[question_id]
+
+    def selection_ids(self, question_id: str) -> List[str]:
+        return list(self._selection_ids[self._questions[question_id]])
+
+    def encode(self, question_id: str, selections: Union[str, Iterable[str]]) -> int:
+        """
+        Encode the selected options of the question.
+
+        Args:
+            question_id (str): The question identifier
+            selections (Union[str, Iterable[str]]): One or several selection identifiers
+
+        Returns:
+            int: The bit mask of the selections
+        """
+        codes = self._selections[self._questions[question_id]]
+        if isinstance(selections, str):
+            return codes.get(selections, self.UNKNOWN)
+        mask = 0
+        for selection in selections:
+            mask |= codes.get(selection, self.UNKNOWN)
+        return mask
+
+    def decode(self, question_id: str, mask: int) -> List[str]:
+        """Selection identifiers of the bit mask, the unknown selections are skipped"""
+        ids = self._selection_ids[self._questions[question_id]]
+        return [s for i, s in enumerate(ids) if mask >> i & 1]
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
 
+from pymechturk.qualification.validation import validate_question_form, validate_answer_key
+
 
 @dataclass
 class QualificationType(object):
@@ -32,11 +34,11 @@ class QualificationType(object):
     def _validate_test(self, test: Optional[str]) -> List[str]:
         if not test:
             return []
-        # TODO Implement the test validation
-        return []
+        return validate_question_form(test)
 
     def _validate_answer(self, answer: Optional[str]) -> List[str]:
         if not answer:
             return []
-        # TODO Implement the answer validation
-        return []
+        if not self.Test:
+            return ["AnswerKey needs the Test"]
+        return validate_answer_key(answer, self.Test)
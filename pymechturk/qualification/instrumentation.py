@@ -0,0 +1,214 @@
+"""
+Optional instrumentation of the XML build and render hot paths.
+
+When enabled, the instrumentation replaces XMLWrapper.compile_elements, to_string, to_bytes, save and _encode_for_url
+with the measuring wrappers, and disabling it puts the original methods back. The disabled instrumentation costs
+nothing.
+
+    with Instrumentation(callback=export) as instrumentation:
+        form.to_string()
+    print(instrumentation.stats()["to_string"].mean_seconds)
+"""
+
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
+from functools import wraps
+from threading import Lock
+from typing import Optional, List, Dict, Callable, Any, Union, TextIO, BinaryIO
+
+from pymechturk.qualification.xml_generator import XMLWrapper, Node
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket counts the slower calls
+LATENCY_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+OPERATIONS = ("compile_elements", "to_string", "to_bytes", "save", "_encode_for_url")
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    # Number of calls per LATENCY_BUCKETS bucket and one more for the slower calls
+    histogram: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    elements: int = 0
+    bytes: int = 0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+
+class _CountingFile(object):
+    """Text or binary file proxy counting the written bytes"""
+
+    def __init__(self, file: Union[TextIO, BinaryIO]):
+        self.file = file
+        self.bytes = 0
+
+    def write(self, data: Union[str, bytes]) -> int:
+        self.bytes += _size(data) if isinstance(data, str) else len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name: str):
+        """The other attributes of the file, e.g. the 'encoding' of the text file"""
+        return getattr(self.file, name)
+
+
+def _size(text: str) -> int:
+    """Size of the UTF-8 encoded text"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _count_nodes(node: Node) -> int:
+    return 1 + sum(_count_nodes(child) for child in node.children)
+
+
+class Instrumentation(object):
+    """Collector of the call counts, latencies and output sizes of the XMLWrapper methods"""
+
+    _active: Optional["Instrumentation"] = None
+    _lock = Lock()
+
+    def __init__(self, callback: Optional[Callable[[str, float, int, int], None]] = None):
+        """
+        Create new instrumentation, it collects nothing until enabled.
+
+        Args:
+            callback (Optional[Callable[[str, float, int, int], None]]): Called after every measured call with
+                the operation name, the latency in seconds, the number of elements and the number of bytes.
+                It runs in the calling thread, so it should be fast
+        """
+        self.callback = callback
+        self._stats: Dict[str, OperationStats] = {operation: OperationStats() for operation in OPERATIONS}
+        self._stats_lock = Lock()
+        self._originals: Dict[str, Any] = dict()
+        self._cache_baseline = (0, 0)
+
+    def __enter__(self) -> "Instrumentation":
+        return self.enable()
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    @property
+    def enabled(self) -> bool:
+        return Instrumentation._active is self
+
+    def enable(self) -> "Instrumentation":
+        """Start measuring the XMLWrapper methods, only one instrumentation can be enabled at a time"""
+        with Instrumentation._lock:
+            assert Instrumentation._active is None, "Another instrumentation is already enabled"
+            Instrumentation._active = self
+            cache = XMLWrapper.fragment_cache
+            self._cache_baseline = (cache.hits, cache.misses) if cache is not None else (0, 0)
+            for operation in OPERATIONS:
+                self._originals[operation] = XMLWrapper.__dict__[operation]
+            XMLWrapper.compile_elements = self._wrap_compile_elements(XMLWrapper.compile_elements)
+            XMLWrapper.to_string = self._wrap_to_string(XMLWrapper.to_string)
+            XMLWrapper.to_bytes = self._wrap_to_bytes(XMLWrapper.to_bytes)
+            XMLWrapper.save = self._wrap_save(XMLWrapper.save)
+            XMLWrapper._encode_for_url = classmethod(self._wrap_encode_for_url(XMLWrapper._encode_for_url.__func__))
+        return self
+
+    def disable(self):
+        """Put the original XMLWrapper methods back, the collected stats are kept"""
+        with Instrumentation._lock:
+            if Instrumentation._active is not self:
+                return
+            for operation, method in self._originals.items():
+                setattr(XMLWrapper, operation, method)
+            self._originals.clear()
+            Instrumentation._active = None
+
+    def stats(self) -> Dict[str, OperationStats]:
+        """The snapshot of the stats per operation name"""
+        with self._stats_lock:
+            return {operation: replace(stats, histogram=list(stats.histogram))
+                    for operation, stats in self._stats.items()}
+
+    def cache_stats(self) -> Optional[Dict[str, Union[int, float]]]:
+        """Hits, misses and hit rate of XMLWrapper.fragment_cache since enabling, None if the cache is disabled"""
+        cache = XMLWrapper.fragment_cache
+        if cache is None:
+            return None
+        hits = max(cache.hits - self._cache_baseline[0], 0)
+        misses = max(cache.misses - self._cache_baseline[1], 0)
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+    def reset(self):
+        with self._stats_lock:
+            self._stats = {operation: OperationStats() for operation in OPERATIONS}
+        cache = XMLWrapper.fragment_cache
+        self._cache_baseline = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    def record(self, operation: str, seconds: float, elements: int = 0, size: int = 0):
+        with self._stats_lock:
+            stats = self._stats[operation]
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.elements += elements
+            stats.bytes += size
+        if self.callback is not None:
+            self.callback(operation, seconds, elements, size)
+
+    def _wrap_compile_elements(self, method: Callable) -> Callable:
+        @wraps(method)
+        def compile_elements(wrapper: XMLWrapper, *args, **kwargs):
+            start = time.perf_counter()
+            root = method(wrapper, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            self.record("compile_elements", seconds, elements=sum(1 for _ in root.iter()))
+            return root
+        return compile_elements
+
+    def _wrap_to_string(self, method: Callable) -> Callable:
+        @wraps(method)
+        def to_string(wrapper: XMLWrapper, root_name: Optional[str] = None, *args, **kwargs):
+            start = time.perf_counter()
+            text = method(wrapper, root_name, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            self.record("to_string", seconds, elements=_count_nodes(wrapper._compile_node(root_name)),
+                        size=_size(text))
+            return text
+        return to_string
+
+    def _wrap_to_bytes(self, method: Callable) -> Callable:
+        @wraps(method)
+        def to_bytes(wrapper: XMLWrapper, root_name: Optional[str] = None, *args, **kwargs):
+            start = time.perf_counter()
+            data = method(wrapper, root_name, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            self.record("to_bytes", seconds, elements=_count_nodes(wrapper._compile_node(root_name)), size=len(data))
+            return data
+        return to_bytes
+
+    def _wrap_save(self, method: Callable) -> Callable:
+        @wraps(method)
+        def save(wrapper: XMLWrapper, path: Union[str, TextIO, BinaryIO], root_name: Optional[str] = None,
+                 *args, **kwargs):
+            start = time.perf_counter()
+            if isinstance(path, str):
+                with open(path, "wb") as file:
+                    counting = _CountingFile(file)
+                    method(wrapper, counting, root_name, *args, **kwargs)
+            else:
+                counting = _CountingFile(path)
+                method(wrapper, counting, root_name, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            self.record("save", seconds, elements=_count_nodes(wrapper._compile_node(root_name)), size=counting.bytes)
+        return save
+
+    def _wrap_encode_for_url(self, function: Callable) -> Callable:
+        @wraps(function)
+        def encode_for_url(cls: type, text: str) -> str:
+            start = time.perf_counter()
+            encoded = function(cls, text)
+            seconds = time.perf_counter() - start
+            self.record("_encode_for_url", seconds, size=_size(encoded))
+            return encoded
+        return encode_for_url
@@ -0,0 +1,114 @@
+"""
+Local scoring of the qualification test answers with the AnswerKey.
+
+The answer key is compiled into one lookup table per question (selection mask -> score), the answers are scored
+column by column, so every question costs one table lookup per submission.
+"""
+
+from array import array
+from itertools import islice
+from operator import add
+from typing import Optional, List, Dict, Iterable, Sequence, Union, FrozenSet
+
+from pymechturk.qualification.coding import SelectionCoding
+from pymechturk.qualification.xml_generator import AnswerKey
+
+Submission = Dict[str, Union[str, Sequence[str]]]
+
+
+class AnswerKeyScorer(object):
+    """
+    Scores the answers the same way as MTurk does: the question gets the score of the AnswerOption whose selections
+    exactly match the selections of the Worker, the scores are summed and mapped to the percentage of the maximum
+    summed score if the QualificationValueMapping is given.
+    """
+
+    def __init__(self, answer_key: AnswerKey, coding: Optional[SelectionCoding] = None):
+        """
+        Compile the answer key.
+
+        Args:
+            answer_key (AnswerKey): The answer key with the question keys
+            coding (Optional[SelectionCoding]): The coding of the encoded answers, usually the coding of the
+                QuestionForm. If None the coding of the answer key is used
+        """
+        self.coding = coding if coding else SelectionCoding.from_answer_key(answer_key)
+        self._tables: List[Optional[Dict[int, int]]] = [None] * len(self.coding)
+
+        tree = answer_key.compile_elements()
+        for question in tree.iterfind("Question"):
+            question_id = question.findtext("QuestionIdentifier")
+            table: Dict[int, int] = dict()
+            for option in question.iterfind("AnswerOption"):
+                mask = self.coding.encode(question_id, [e.text for e in option.iterfind("SelectionIdentifier")])
+                table.setdefault(mask, int(option.findtext("AnswerScore")))
+            self._tables[self.coding.question_index(question_id)] = table
+
+        max_score = tree.findtext("QualificationValueMapping/PercentageMapping/MaximumSummedScore")
+        self.maximum_score: Optional[int] = int(max_score) if max_score is not None else None
+
+    def best_masks(self) -> Dict[str, FrozenSet[int]]:
+        """The selection masks which get the highest positive score of every question of the key"""
+        masks: Dict[str, FrozenSet[int]] = dict()
+        for question_id, table in zip(self.coding.question_ids, self._tables):
+            if table and max(table.values()) > 0:
+                best = max(table.values())
+                masks[question_id] = frozenset(mask for mask, score in table.items() if score == best)
+        return masks
+
+    def score_columns(self, columns: Sequence[Sequence[int]]) -> array:
+        """
+        Score the encoded answers.
+
+        Args:
+            columns (Sequence[Sequence[int]]): One column of selection masks per question of the coding, the rows are
+                the submissions
+
+        Returns:
+            array: The summed scores of the submissions
+        """
+        assert len(columns) == len(self.coding),\
+            f"Expected {len(self.coding)} columns, one per question, received {len(columns)}"
+        totals = [0] * (len(columns[0]) if columns else 0)
+        for table, column in zip(self._tables, columns):
+            if table:
+                totals = list(map(add, totals, map(table.get, column, [0] * len(column))))
+        return array("q", totals)
+
+    def score(self, submissions: Iterable[Submission], batch_size: int = 100000) -> array:
+        """
+        Score the submissions.
+
+        Args:
+            submissions (Iterable[Dict[str, Union[str, Sequence[str]]]]): The answers {question_id: selection_ids}
+            batch_size (int): Number of submissions encoded at once
+
+        Returns:
+            array: The summed scores of the submissions
+        """
+        scores = array("q")
+        iterator = iter(submissions)
+        encode = self.coding.encode
+        question_ids = self.coding.question_ids
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return scores
+            columns = [[encode(q, s[q]) if q in s else 0 for s in batch] for q in question_ids]
+            scores.extend(self.score_columns(columns))
+
+    def qualification_values(self, scores: Sequence[int]) -> array:
+        """
+        Map the summed scores to the Qualification values.
+
+        Args:
+            scores (Sequence[int]): The summed scores
+
+        Returns:
+            array: The percentages of the maximum summed score rounded to the nearest integer, or the summed scores
+                if the answer key has no QualificationValueMapping
+        """
+        if not self.maximum_score:
+            return array("q", scores)
+        maximum = self.maximum_score
+        return array("q", [(200 * s + maximum) // (2 * maximum) for s in scores])
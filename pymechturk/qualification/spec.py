@@ -0,0 +1,175 @@
+"""
+Declarative specs of the QuestionForm and AnswerKey.
+
+The spec is a JSON object which describes the form the same way the builders do. Every string of the spec is a
+format string, its fields like "{image_url}" or "{image_url:extension}" are Slot placeholders filled from the data
+rows, and the literal braces are written as "{{" and "}}". The form is compiled into a Template once, so every row is
+rendered by joining the escaped values only.
+
+    {
+        "type": "QuestionForm",
+        "elements": [
+            {"overview": [{"title": "Instructions"}, {"list": ["Look at the image", "Choose the animal"]}]},
+            {"question": {
+                "id": "animal",
+                "name": "Animal",
+                "is_required": true,
+                "content": [{"text": "What is on the image {image_id}?"}, {"image": {"url": "{image_url}"}}],
+                "answer": {"selection": {"selections": {"cat": "Cat", "dog": "Dog"}, "answer_style": "radiobutton"}}
+            }}
+        ]
+    }
+
+    {
+        "type": "AnswerKey",
+        "questions": [{"id": "animal", "keys": {"1": ["{label}"]}}],
+        "max_score": 1
+    }
+
+The content items are {"title": text}, {"text": text}, {"formatted_text": xhtml}, {"list": [text, ...]} and
+{"image": {"url": url, "alt_text": text}}. The answers are {"selection": SelectionAnswer arguments} and
+{"free_text": FreeTextAnswer arguments}. An image URL with a field should end with the field or with a literal file
+extension, the MIME subtype is taken from it.
+"""
+
+import json
+from string import Formatter
+from typing import Optional, Dict, List, Any
+
+from pymechturk.qualification.xml_generator import XMLWrapper, Content, Question, SelectionAnswer, FreeTextAnswer,\
+    Answer, AnswerKey, QuestionForm, Slot, question_id_scope
+from pymechturk.qualification.template import Template
+
+_FORMATTER = Formatter()
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """Read the spec from the JSON file"""
+    with open(path, "r", encoding="utf-8") as file:
+        spec = json.load(file)
+    assert isinstance(spec, dict), f"The spec {path} should be a JSON object"
+    return spec
+
+
+def compile_spec(spec: Dict[str, Any],
+                 root_name: Optional[str] = None,
+                 url_safe: bool = False,
+                 formatted: bool = True,
+                 indent: int = 4) -> Template:
+    """
+    Compile the spec into the template, its slots are the fields of the spec strings.
+
+    Args:
+        spec (Dict[str, Any]): The QuestionForm or AnswerKey spec
+        root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+        url_safe (bool): Encode the rendered output for using it in the URL
+        formatted (bool): Render indented XML
+        indent (int): Number of spaces for one level of the indentation
+
+    Returns:
+        Template: The template rendered with the data rows as slot values
+    """
+    return Template(build_from_spec(spec), root_name, url_safe=url_safe, formatted=formatted, indent=indent)
+
+
+def build_from_spec(spec: Dict[str, Any]) -> XMLWrapper:
+    """
+    Build the wrapper described by the spec, the fields of the spec strings become Slot placeholders.
+
+    Args:
+        spec (Dict[str, Any]): The QuestionForm or AnswerKey spec
+
+    Returns:
+        XMLWrapper: The QuestionForm or AnswerKey object
+    """
+    builders = {"QuestionForm": _build_question_form, "AnswerKey": _build_answer_key}
+    spec_type = spec.get("type", "QuestionForm")
+    assert spec_type in builders, f"The spec type should be one of {list(builders)}, received {spec_type!r}"
+    return builders[spec_type](spec)
+
+
+def _build_question_form(spec: Dict[str, Any]) -> QuestionForm:
+    form = QuestionForm()
+    with question_id_scope(form.question_ids):
+        for element in spec.get("elements", []):
+            assert len(element) == 1 and ("overview" in element or "question" in element), \
+                f"The form element should be {{'overview': [...]}} or {{'question': {{...}}}}, received {element}"
+            if "overview" in element:
+                form.add_overview(_build_content(element["overview"]))
+            else:
+                form.add_question(_build_question(element["question"]))
+    return form
+
+
+def _build_question(spec: Dict[str, Any]) -> Question:
+    return Question(
+        content=_build_content(spec.get("content", [])),
+        answer=_build_answer(spec["answer"]),
+        name=_slotted(spec.get("name")),
+        is_required=bool(spec.get("is_required", False)),
+        question_id=_slotted(spec.get("id")))
+
+
+def _build_content(items: List[Dict[str, Any]]) -> Content:
+    content = Content()
+    for item in items:
+        assert len(item) == 1, f"The content item should have one key, received {item}"
+        (kind, value), = item.items()
+        if kind == "title":
+            content.add_title(_slotted(value))
+        elif kind == "text":
+            content.add_text(_slotted(value))
+        elif kind == "formatted_text":
+            content.add_formatted_text(_slotted(value))
+        elif kind == "list":
+            content.add_list([_slotted(i) for i in value])
+        elif kind == "image":
+            image = value if isinstance(value, dict) else {"url": value}
+            content.add_image(_slotted(image["url"]), _slotted(image.get("alt_text", "image")))
+        else:
+            raise AssertionError(f"Unknown content item {kind!r}")
+    return content
+
+
+def _build_answer(spec: Dict[str, Any]) -> Answer:
+    assert len(spec) == 1 and ("selection" in spec or "free_text" in spec), \
+        f"The answer should be {{'selection': {{...}}}} or {{'free_text': {{...}}}}, received {spec}"
+    if "selection" in spec:
+        arguments = dict(spec["selection"])
+        arguments["selections"] = {_slotted(k): _slotted(v) for k, v in arguments["selections"].items()}
+        arguments["answer_style"] = _slotted(arguments.get("answer_style"))
+        return SelectionAnswer(**arguments)
+    arguments = dict(spec["free_text"])
+    for name in ("default_text", "reg_exp", "error_text"):
+        arguments[name] = _slotted(arguments.get(name))
+    return FreeTextAnswer(**arguments)
+
+
+def _build_answer_key(spec: Dict[str, Any]) -> AnswerKey:
+    answer_key = AnswerKey()
+    with question_id_scope():
+        for question in spec.get("questions", []):
+            # The key needs the question identifier only
+            placeholder = Question(Content(), FreeTextAnswer(), question_id=_slotted(question["id"]))
+            keys = {int(score): [_slotted(a) for a in answers] for score, answers in question["keys"].items()}
+            answer_key.add_question_keys(placeholder, keys)
+    if "max_score" in spec:
+        answer_key.add_max_score(int(spec["max_score"]))
+    return answer_key
+
+
+def _slotted(text: Optional[str]) -> Optional[str]:
+    """Replace the format fields of the text with Slot placeholders. A text of one field becomes the Slot itself"""
+    if text is None:
+        return None
+    assert isinstance(text, str), f"The spec value should be a string, received {text!r}"
+    entries = list(_FORMATTER.parse(text))
+    parts = list()
+    for literal, field, format_spec, conversion in entries:
+        parts.append(literal)
+        if field is not None:
+            assert conversion is None, f"The conversion !{conversion} is not supported in {text!r}"
+            parts.append(Slot(field, format_spec or None))
+    if len(entries) == 1 and parts[0] == "" and len(parts) == 2:
+        return parts[1]
+    return "".join(parts)
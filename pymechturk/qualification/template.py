@@ -0,0 +1,139 @@
+"""
+Compiled templates for the XML wrappers.
+
+A form which is built with Slot placeholders is serialized once, the static XML between the slots is cached and every
+following render only escapes and joins the slot values. The output is the same as the output of the form built with
+the values themselves.
+"""
+
+import re
+from typing import Optional, List, Dict, Tuple, Callable
+
+from pymechturk.qualification.xml_generator import XMLWrapper, Slot
+
+
+class Template(object):
+    """Compiled XMLWrapper (QuestionForm, AnswerKey, ...) with named slots"""
+
+    DERIVATIONS: Dict[str, Callable[[str], str]] = {
+        "extension": lambda value: value.split(".")[-1],
+    }
+
+    def __init__(self, wrapper: XMLWrapper,
+                 root_name: Optional[str] = None,
+                 url_safe: bool = False,
+                 formatted: bool = True,
+                 indent: int = 4):
+        """
+        Compile the wrapper into the template.
+
+        Args:
+            wrapper (XMLWrapper): The object built with Slot placeholders
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+            url_safe (bool): Encode the rendered output for using it in the URL
+            formatted (bool): Render indented XML
+            indent (int): Number of spaces for one level of the indentation
+        """
+        self._url_safe = url_safe
+        self._formatted = formatted
+        self._fragments: List[str] = list()
+        # The name, derivation and attribute flag of every slot. The last slot of an element text made of the slots
+        # only has the index of the first slot, the length of the end tag and the end of the empty element
+        self._slots: List[Tuple[str, Optional[str], bool, Optional[Tuple[int, int, str]]]] = list()
+        self._compile(wrapper.to_string(root_name, url_safe=False, formatted=formatted, indent=indent))
+
+    @property
+    def slots(self) -> List[str]:
+        """Names of the values needed for rendering"""
+        return list(dict.fromkeys(name for name, _, _, _ in self._slots))
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Render the template with given slot values.
+
+        Args:
+            values (Dict[str, str]): The dictionary of {slot_name: value}. The element with the empty text is written
+                as the empty element, e.g. <Text/>
+
+        Returns:
+            str: The XML string
+        """
+        fragments = self._fragments
+        parts = [fragments[0]]
+        for i, (name, derivation, is_attribute, element) in enumerate(self._slots):
+            try:
+                value = values[name]
+            except KeyError:
+                raise KeyError(f"Missing value for the slot '{name}'") from None
+            if derivation:
+                value = self.DERIVATIONS[derivation](value)
+            value = self._escape(value, is_attribute)
+            if self._url_safe:
+                value = XMLWrapper._encode_for_url(value)
+            parts.append(value)
+            fragment = fragments[i + 1]
+            if element is not None:
+                first, end_length, empty_end = element
+                if not any(parts[2 * j + 1] for j in range(first, i + 1)):
+                    # The element without text is written as "<Tag/>", the ">" of its start tag is dropped
+                    parts[2 * first] = parts[2 * first][:-1]
+                    fragment = empty_end + fragment[end_length:]
+            parts.append(fragment)
+        return "".join(parts)
+
+    def _compile(self, text: str):
+        if self._formatted:
+            open_mark, close_mark = Slot.OPEN, Slot.CLOSE
+        else:
+            open_mark, close_mark = (f"&#{ord(Slot.OPEN)};", f"&#{ord(Slot.CLOSE)};")
+        pattern = re.compile(re.escape(open_mark) + r"(\w+)(?:\|(\w+))?" + re.escape(close_mark))
+
+        position = 0
+        for match in pattern.finditer(text):
+            fragment = text[position:match.start()]
+            name, derivation = match.groups()
+            assert derivation is None or derivation in self.DERIVATIONS, f"Unknown slot derivation '{derivation}'"
+            # Markup characters are always escaped in values, so an unclosed tag means the slot is an attribute value
+            is_attribute = text.rfind("<", 0, match.start()) > text.rfind(">", 0, match.start())
+            self._fragments.append(fragment)
+            self._slots.append((name, derivation, is_attribute, None))
+            position = match.end()
+        self._fragments.append(text[position:])
+
+        self._find_elements()
+        if self._url_safe:
+            self._fragments = [XMLWrapper._encode_for_url(f) for f in self._fragments]
+
+    def _find_elements(self):
+        """Find the element texts made of the slots only, they are written as the empty elements if all are empty"""
+        fragments = self._fragments
+        first = None
+        for i, (name, derivation, is_attribute, _) in enumerate(self._slots):
+            if is_attribute:
+                first = None
+                continue
+            if fragments[i].endswith(">"):
+                first = i
+            elif fragments[i]:
+                first = None
+            if first is None:
+                continue
+            # The start tag begins in an earlier fragment if it has the attribute slots
+            k = first
+            while "<" not in fragments[k]:
+                k -= 1
+            start = fragments[k]
+            end_tag = f"</{start[start.rfind('<') + 1:].split(' ')[0].rstrip('>')}>"
+            if fragments[i + 1].startswith(end_tag):
+                empty_end = "/>" if self._formatted else " />"
+                if self._url_safe:
+                    end_tag, empty_end = XMLWrapper._encode_for_url(end_tag), XMLWrapper._encode_for_url(empty_end)
+                self._slots[i] = (name, derivation, is_attribute, (first, len(end_tag), empty_end))
+
+    def _escape(self, value: str, is_attribute: bool) -> str:
+        if self._formatted:
+            if not is_attribute:
+                value = XMLWrapper._normalize_newlines(value)
+            return XMLWrapper._escape(value)
+        value = XMLWrapper._escape_attribute(value) if is_attribute else XMLWrapper._escape_text(value)
+        return value.encode("ascii", "xmlcharrefreplace").decode("ascii")
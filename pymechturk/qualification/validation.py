@@ -0,0 +1,196 @@
+"""
+Structural validation of the qualification test QuestionForm and its AnswerKey.
+
+The allowed children of every element are described by the rules in the same notation as the MTurk documentation
+(sequence of names with ?, * and + quantifiers). The rules are compiled into regular expressions over the child tag
+names once per process, so validating a form costs one pass over its elements.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, List, Dict, Set, Union
+import xml.etree.ElementTree as ET
+
+from pymechturk.qualification.xml_generator import XMLWrapper, QuestionForm, AnswerKey
+
+CONTENT = "(Title|Text|List|Binary|Application|EmbeddedBinary|FormattedContent)*"
+
+QUESTION_FORM_RULES = {
+    "QuestionForm": "(Overview|Question)+",
+    "Overview": CONTENT,
+    "Question": "QuestionIdentifier DisplayName? IsRequired? QuestionContent AnswerSpecification",
+    "QuestionContent": CONTENT,
+    "AnswerSpecification": "(FreeTextAnswer|SelectionAnswer|FileUploadAnswer)",
+    "FreeTextAnswer": "Constraints? DefaultText? NumberOfLinesSuggestion?",
+    "Constraints": "(IsNumeric|Length|AnswerFormatRegex)*",
+    "SelectionAnswer": "MinSelectionCount? MaxSelectionCount? StyleSuggestion? Selections",
+    "Selections": "Selection+ OtherSelection?",
+    "Selection": "SelectionIdentifier (Text|FormattedContent|Binary)",
+    "List": "ListItem+",
+    "Binary": "MimeType DataURL AltText",
+    "MimeType": "Type SubType?",
+}
+
+ANSWER_KEY_RULES = {
+    "AnswerKey": "Question+ QualificationValueMapping?",
+    "Question": "QuestionIdentifier AnswerOption+ DefaultScore?",
+    "AnswerOption": "SelectionIdentifier+ AnswerScore",
+    "QualificationValueMapping": "(PercentageMapping|ScaleMapping|RangeMapping)",
+    "PercentageMapping": "MaximumSummedScore",
+}
+
+INTEGER_FIELDS = ("MinSelectionCount", "MaxSelectionCount", "NumberOfLinesSuggestion", "AnswerScore", "DefaultScore",
+                  "MaximumSummedScore")
+
+
+@lru_cache(maxsize=None)
+def _compile_rule(rule: str) -> "re.Pattern":
+    """Every tag name of the rule matches the name followed by a comma in the string of the child tags"""
+    pattern = re.sub(r"[A-Za-z]+", lambda m: f"(?:{m.group(0)},)", rule)
+    return re.compile(pattern.replace(" ", ""))
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _parse(document: Union[str, XMLWrapper, ET.Element], errors: List[str]) -> Optional[ET.Element]:
+    if isinstance(document, XMLWrapper):
+        return document.compile_elements()
+    if isinstance(document, ET.Element):
+        return document
+    try:
+        return ET.fromstring(document)
+    except ET.ParseError as error:
+        errors.append(f"Invalid XML: {error}")
+        return None
+
+
+def _check_structure(root: ET.Element, root_name: str, rules: Dict[str, str], errors: List[str]):
+    if _local_name(root.tag) != root_name:
+        errors.append(f"The root element should be <{root_name}>, received <{_local_name(root.tag)}>")
+        return
+    for element in root.iter():
+        tag = _local_name(element.tag)
+        if tag in INTEGER_FIELDS and not re.fullmatch(r"\s*-?\d+\s*", element.text or ""):
+            errors.append(f"<{tag}> should be an integer, received {element.text!r}")
+        rule = rules.get(tag)
+        if rule is None:
+            continue
+        children = "".join(_local_name(child.tag) + "," for child in element)
+        if not _compile_rule(rule).fullmatch(children):
+            errors.append(f"Unexpected content of <{tag}>: '{children.rstrip(',')}', expected '{rule}'")
+
+
+def _form_selections(root: ET.Element, errors: List[str]) -> Dict[str, Optional[Set[str]]]:
+    """Selection identifiers of the questions, None for the questions without SelectionAnswer"""
+    questions: Dict[str, Optional[Set[str]]] = dict()
+    for question in root:
+        if _local_name(question.tag) != "Question":
+            continue
+        children = {_local_name(child.tag): child for child in question}
+        question_id = (children["QuestionIdentifier"].text or "") if "QuestionIdentifier" in children else ""
+        if not question_id.strip():
+            errors.append("QuestionIdentifier should not be empty")
+        elif question_id in questions:
+            errors.append(f"Duplicated QuestionIdentifier '{question_id}'")
+        if "IsRequired" in children and children["IsRequired"].text not in ("true", "false"):
+            errors.append(f"IsRequired of '{question_id}' should be 'true' or 'false'")
+
+        selections: Optional[Set[str]] = None
+        for answer in question.iter():
+            if _local_name(answer.tag) == "SelectionAnswer":
+                selections = set()
+                for identifier in answer.iter():
+                    if _local_name(identifier.tag) != "SelectionIdentifier":
+                        continue
+                    if identifier.text in selections:
+                        errors.append(f"Duplicated SelectionIdentifier '{identifier.text}' in '{question_id}'")
+                    selections.add(identifier.text)
+        questions[question_id] = selections
+    return questions
+
+
+def validate_question_form(form: Union[str, QuestionForm, ET.Element]) -> List[str]:
+    """
+    Validate the QuestionForm.
+
+    Args:
+        form (Union[str, QuestionForm, ET.Element]): The XML string, the QuestionForm object or its compiled tree
+
+    Returns:
+        List[str]: The errors, empty if the form is valid
+    """
+    errors: List[str] = list()
+    root = _parse(form, errors)
+    if root is not None:
+        _check_structure(root, "QuestionForm", QUESTION_FORM_RULES, errors)
+        _form_selections(root, errors)
+    return errors
+
+
+def validate_answer_key(answer_key: Union[str, AnswerKey, ET.Element],
+                        form: Union[str, QuestionForm, ET.Element, None] = None) -> List[str]:
+    """
+    Validate the AnswerKey and its consistency with the QuestionForm.
+
+    Args:
+        answer_key (Union[str, AnswerKey, ET.Element]): The XML string, the AnswerKey object or its compiled tree
+        form (Union[str, QuestionForm, ET.Element, None]): The form of the answer key. If None the references to
+            the form questions are not checked
+
+    Returns:
+        List[str]: The errors, empty if the answer key is valid
+    """
+    errors: List[str] = list()
+    root = _parse(answer_key, errors)
+    if root is None:
+        return errors
+    _check_structure(root, "AnswerKey", ANSWER_KEY_RULES, errors)
+    if errors:
+        return errors
+
+    form_root = _parse(form, errors) if form is not None else None
+    questions = _form_selections(form_root, list()) if form_root is not None else None
+
+    seen: Set[str] = set()
+    achievable = 0
+    for question in root.iterfind("*"):
+        if _local_name(question.tag) != "Question":
+            continue
+        children = list(question)
+        question_id = children[0].text or ""
+        if question_id in seen:
+            errors.append(f"Duplicated answer key for '{question_id}'")
+        seen.add(question_id)
+
+        selections = None
+        if questions is not None:
+            if question_id not in questions:
+                errors.append(f"The answer key refers to the unknown question '{question_id}'")
+            elif questions[question_id] is None:
+                errors.append(f"The answer key refers to the question '{question_id}' without SelectionAnswer")
+            else:
+                selections = questions[question_id]
+
+        scores = [0]
+        for option in children[1:]:
+            if _local_name(option.tag) == "DefaultScore":
+                scores.append(int(option.text))
+                continue
+            option_children = list(option)
+            scores.append(int(option_children[-1].text))
+            for identifier in option_children[:-1]:
+                if selections is not None and identifier.text not in selections:
+                    errors.append(f"Unknown SelectionIdentifier '{identifier.text}' in the key of '{question_id}'")
+        achievable += max(scores)
+
+    for maximum in root.iter():
+        if _local_name(maximum.tag) != "MaximumSummedScore":
+            continue
+        maximum_score = int(maximum.text)
+        if maximum_score <= 0:
+            errors.append(f"MaximumSummedScore should be positive, received {maximum_score}")
+        elif achievable > maximum_score:
+            errors.append(f"The summed score can reach {achievable}, more than MaximumSummedScore {maximum_score}")
+    return errors
@@ -8,18 +8,118 @@ https://docs.aws.amazon.com/AWSMechTurk/latest/AWSMturkAPI/ApiReference_AnswerKe
 The main descriptions of the classes was copied from the link above
 """
 
-from typing import Optional, List, Dict
-from xml.dom import minidom
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional, List, Dict, Callable, Iterable, Iterator, Any, Union, TextIO, BinaryIO, Sequence, Tuple,\
+    TYPE_CHECKING
 import xml.etree.ElementTree as ET
-import re
+
+if TYPE_CHECKING:
+    # The module is kept free of the package imports at runtime, so its example runs as a script
+    from pymechturk.qualification.cache import FragmentCache
+
+
+class Slot(str):
+    """
+    Named placeholder for a text value that changes between otherwise identical forms. A Slot can be passed to the
+    builders instead of a text or an URL, and pymechturk.qualification.template.Template substitutes it on render.
+    """
+
+    OPEN = "\ue000"
+    CLOSE = "\ue001"
+
+    def __new__(cls, name: str, derivation: Optional[str] = None):
+        assert name.isidentifier(), f"Slot name should be a valid identifier, received {name!r}"
+        token = f"{name}|{derivation}" if derivation else name
+        slot = super().__new__(cls, f"{cls.OPEN}{token}{cls.CLOSE}")
+        slot.name = name
+        slot.derivation = derivation
+        return slot
+
+    def __getnewargs__(self) -> Tuple[str, Optional[str]]:
+        """The arguments of __new__ for copy and pickle, the inherited ones are the marker string"""
+        return self.name, self.derivation
+
+    def extension(self) -> "Slot":
+        """The slot which is filled with the file extension of this slot value"""
+        return Slot(self.name, "extension")
+
+
+class Node(object):
+    """
+    Lightweight XML element recorded by the builders. The ElementTree is created only by compile_elements, the
+    serialization is done from the nodes directly.
+    """
+
+    __slots__ = ("tag", "text", "attrib", "children", "hash", "size")
+
+    def __init__(self, tag: str,
+                 text: Optional[str] = None,
+                 attrib: Optional[Dict[str, str]] = None,
+                 children: Sequence["Node"] = ()):
+        self.tag = tag
+        self.text = text
+        self.attrib = attrib
+        self.children = children
+        # Structural hash of the wrapper fields and the nested compiled roots, their rendered fragments can be cached
+        self.hash: Optional[int] = None
+        # Serialized size counters of the wrapper fields and compiled roots, see XMLWrapper.estimated_size
+        self.size: Optional[Tuple[int, ...]] = None
+
+    def to_element(self) -> ET.Element:
+        element = ET.Element(self.tag, attrib=self.attrib or {})
+        element.text = self.text
+        element.extend([child.to_element() for child in self.children])
+        return element
+
+
+class SizeLimitExceeded(ValueError):
+    """The element is not added, because the serialized wrapper would exceed its size limit"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"The serialized size {size} exceeds the limit {limit}")
+        self.size = size
+        self.limit = limit
 
 
 class XMLWrapper(object):
     """Base class for compiling XML QuestionForm"""
 
+    # Process-wide cache of the rendered fragments, disabled if None
+    fragment_cache: Optional["FragmentCache"] = None
+    # Number of characters buffered before writing to the file
+    STREAM_CHUNK_SIZE = 1 << 16
+
+    _URL_ENCODING = (
+        ("$", "%24"),
+        ("&", "%26"),
+        ("+", "%2B"),
+        (",", "%2C"),
+        ("/", "%2F"),
+        (":", "%3A"),
+        (";", "%3B"),
+        ("?", "%3F"),
+        ("@", "%40")
+    )
+    # Deletes the characters replaced by the URL encoding, each of them becomes 3 characters long
+    _URL_SPECIALS = dict.fromkeys(ord(c) for c, _ in _URL_ENCODING)
+    _URL_SPECIAL_BYTES = "".join(c for c, _ in _URL_ENCODING).encode("ascii")
+    # Deletes all the bytes except the ones escaped by the writers and the carriage return
+    _NOT_ESCAPED_BYTES = bytes(b for b in range(256) if b not in b"&<>\"\r")
+    # Compact size and URL specials, formatted size and URL specials, number of lines and sum of their depths
+    _EMPTY_SIZE = (0, 0, 0, 0, 0, 0)
+
     def __init__(self):
-        self._elements: List[ET.Element] = list()
+        self._elements: List[Node] = list()
         self._attributes = dict()
+        self._hash = 0
+        self._size = self._EMPTY_SIZE
+        self._counted = 0
+        self._size_limit: Optional[Tuple[int, bool, bool, int]] = None
+        # The number of elements and the root name the digest was computed for, and the digest
+        self._digest: Optional[Tuple[Tuple[int, Optional[str]], str]] = None
 
     def __len__(self):
         """Get number of elements"""
@@ -29,44 +129,535 @@ class XMLWrapper(object):
                   url_safe: bool = False,
                   formatted: bool = True,
                   indent: int = 4) -> str:
-        tree = self.compile_elements(root_name)
-        tree_str = ET.tostring(tree, encoding="ascii", method="xml").decode("ascii")
-        if formatted:
-            tree_str = minidom.parseString(tree_str).toprettyxml(indent=' ' * indent)
-        tree_str = re.sub(r"<\?xml.*\?>", '', tree_str)[1:]
-        if url_safe:
-            tree_str = self._encode_for_url(tree_str)
-        return tree_str
+        parts: List[str] = list()
+        self._write_tree(self._compile_node(root_name), parts.append, formatted, indent)
+        return self._finalize("".join(parts), url_safe, formatted)
+
+    def to_bytes(self, root_name: Optional[str] = None,
+                 url_safe: bool = False,
+                 formatted: bool = True,
+                 indent: int = 4) -> bytes:
+        """
+        Render the XML encoded in UTF-8, e.g. for the HTTP request body. The output is to_string encoded, but the text
+        is encoded once instead of the round trip through the str of to_string.
+
+        Args:
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+            url_safe (bool): Encode the output for using it in the URL
+            formatted (bool): Render indented XML, otherwise the output is ASCII
+            indent (int): Number of spaces for one level of the indentation
+
+        Returns:
+            bytes: The encoded XML
+        """
+        parts: List[str] = list()
+        self._write_tree(self._compile_node(root_name), parts.append, formatted, indent)
+        return self._finalize_bytes("".join(parts), url_safe, formatted)
+
+    def write_to(self, buffer: Union[bytearray, BinaryIO],
+                 root_name: Optional[str] = None,
+                 url_safe: bool = False,
+                 formatted: bool = True,
+                 indent: int = 4) -> int:
+        """
+        Write the encoded XML (see to_bytes) into the buffer in chunks, so the whole document is never held in memory.
+
+        Args:
+            buffer (Union[bytearray, BinaryIO]): The bytearray to extend or the binary file-like object
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+            url_safe (bool): Encode the output for using it in the URL
+            formatted (bool): Write indented XML, otherwise the output is ASCII
+            indent (int): Number of spaces for one level of the indentation
+
+        Returns:
+            int: Number of the written bytes
+        """
+        write = buffer.extend if isinstance(buffer, bytearray) else buffer.write
+        written = 0
 
-    def save(self, path: str,
+        def sink(text: str):
+            nonlocal written
+            data = self._finalize_bytes(text, url_safe, formatted)
+            write(data)
+            written += len(data)
+
+        self._stream(sink, root_name, formatted, indent)
+        return written
+
+    def save(self, path: Union[str, TextIO, BinaryIO],
              root_name: Optional[str] = None,
              url_safe: bool = False,
              formatted: bool = True,
              indent: int = 4):
-        tree_str = self.to_string(root_name, url_safe=url_safe, formatted=formatted, indent=indent)
-        with open(path, "w") as file:
-            file.write(tree_str)
+        """
+        Save the XML into the file. The output is written in chunks, so the whole document is never held in memory.
+        The file opened by the path is written in UTF-8 by write_to.
+
+        Args:
+            path (Union[str, TextIO, BinaryIO]): The file path, the opened text file or the opened binary file. The
+                file objects with the 'encoding' attribute are written as text
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+            url_safe (bool): Encode the output for using it in the URL
+            formatted (bool): Write indented XML
+            indent (int): Number of spaces for one level of the indentation
+        """
+        if isinstance(path, str):
+            with open(path, "wb") as file:
+                self.write_to(file, root_name, url_safe, formatted, indent)
+        elif hasattr(path, "encoding"):
+            self._stream(lambda text: path.write(self._finalize(text, url_safe, formatted)), root_name, formatted,
+                         indent)
+        else:
+            self.write_to(path, root_name, url_safe, formatted, indent)
+
+    def _stream(self, sink: Callable[[str], object],
+                root_name: Optional[str],
+                formatted: bool,
+                indent: int):
+        """Pass the serialized XML to the sink in the parts of about STREAM_CHUNK_SIZE characters"""
+        buffer: List[str] = list()
+        buffered = 0
+
+        def write(part: str):
+            nonlocal buffered
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= self.STREAM_CHUNK_SIZE:
+                flush()
+
+        def flush():
+            nonlocal buffered
+            sink("".join(buffer))
+            buffer.clear()
+            buffered = 0
+
+        self._write_tree(self._compile_node(root_name), write, formatted, indent)
+        flush()
+
+    @classmethod
+    def _write_tree(cls, tree: Node, write: Callable[[str], object], formatted: bool, indent: int):
+        if formatted:
+            cls._write_formatted(tree, write, ' ' * indent)
+        else:
+            cls._write_compact(tree, write)
+
+    @classmethod
+    def _finalize(cls, text: str, url_safe: bool, formatted: bool) -> str:
+        """Character-wise post-processing of the output, it can be applied to any part of the document separately"""
+        if not formatted and not text.isascii():
+            text = text.encode("ascii", "xmlcharrefreplace").decode("ascii")
+        if url_safe:
+            text = cls._encode_for_url(text)
+        return text
+
+    @classmethod
+    def _finalize_bytes(cls, text: str, url_safe: bool, formatted: bool) -> bytes:
+        """The finalized text encoded in UTF-8, the compact text is encoded with the character references directly"""
+        if url_safe:
+            # The character references are URL encoded as well, so they are written first
+            return cls._finalize(text, url_safe, formatted).encode("utf-8")
+        return text.encode("utf-8") if formatted else text.encode("ascii", "xmlcharrefreplace")
+
+    @classmethod
+    def render_many(cls, items: Iterable[Any], **kwargs) -> Iterator[str]:
+        """
+        Render many forms in parallel, see pymechturk.qualification.batch.render_many for the arguments.
+
+        Args:
+            items (Iterable[Any]): XMLWrapper objects or the specs for the 'builder' argument
+
+        Returns:
+            Iterator[str]: Rendered XML strings or the saved file paths
+        """
+        from pymechturk.qualification.batch import render_many
+        return render_many(items, **kwargs)
+
+    @property
+    def structural_hash(self) -> int:
+        """Hash of the added elements, equal for the wrappers with the same content"""
+        return self._hash
+
+    def to_canonical(self, root_name: Optional[str] = None) -> bytes:
+        """
+        Render the Canonical XML (https://www.w3.org/TR/xml-c14n2/) of the wrapper: compact, encoded in UTF-8, the
+        attributes sorted and the empty elements written with the end tag. The wrappers with the same content give the
+        same bytes in any process, unlike structural_hash. The generated question identifiers are a part of the
+        content, build the form in question_id_scope to number them from 1.
+
+        Args:
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+
+        Returns:
+            bytes: The canonical XML, equal to xml.etree.ElementTree.canonicalize of the to_string(formatted=False)
+                output, the indentation of the formatted output is a part of the canonical text
+        """
+        parts: List[str] = list()
+        self._write_canonical(self._compile_node(root_name), parts.append)
+        return "".join(parts).encode("utf-8")
+
+    def digest(self, root_name: Optional[str] = None) -> str:
+        """
+        Get the content digest for the caches and the deduplication of the forms. It is computed once and kept until
+        the next element is added.
+
+        Args:
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+
+        Returns:
+            str: The SHA-256 hex digest of the to_canonical output
+        """
+        key = (len(self._elements), root_name)
+        if self._digest is None or self._digest[0] != key:
+            self._digest = (key, hashlib.sha256(self.to_canonical(root_name)).hexdigest())
+        return self._digest[1]
+
+    def estimated_size(self, root_name: Optional[str] = None,
+                       url_safe: bool = False,
+                       formatted: bool = True,
+                       indent: int = 4) -> int:
+        """
+        Get the size of the serialized XML without rendering it. The sizes of the elements are counted once and
+        cached, so the repeated calls only count the elements added since the previous call. The size equals the
+        length of the to_string output encoded in UTF-8 (the Slot placeholders are counted as they are).
+
+        Args:
+            root_name (Optional[str]): The name of the XML tree root. If None it use the class name
+            url_safe (bool): Count the output encoded for using it in the URL
+            formatted (bool): Count indented XML
+            indent (int): Number of spaces for one level of the indentation
+
+        Returns:
+            int: The size in bytes
+        """
+        return self._evaluate_size(self._root_size(root_name, self._count_size()), url_safe, formatted, indent)
+
+    def limit_size(self, max_size: Optional[int],
+                   url_safe: bool = False,
+                   formatted: bool = True,
+                   indent: int = 4) -> "XMLWrapper":
+        """
+        Reject the elements which would make the serialized XML longer than max_size, see estimated_size. The adding
+        method raises SizeLimitExceeded and the wrapper stays unchanged, so the caller can move the element to the
+        next form. The size of every added element is counted right away, so the limited wrappers are built slower.
+
+        Args:
+            max_size (Optional[int]): The maximum size in bytes. If None the size is not limited
+            url_safe (bool): Limit the output encoded for using it in the URL
+            formatted (bool): Limit indented XML
+            indent (int): Number of spaces for one level of the indentation
+
+        Returns:
+            XMLWrapper: Return self
+        """
+        if max_size is None:
+            self._size_limit = None
+            return self
+        size = self.estimated_size(url_safe=url_safe, formatted=formatted, indent=indent)
+        if size > max_size:
+            raise SizeLimitExceeded(size, max_size)
+        self._size_limit = (max_size, url_safe, formatted, indent)
+        return self
+
+    def _append(self, node: Node):
+        node.hash = self._node_hash(node)
+        if self._size_limit is not None:
+            max_size, url_safe, formatted, indent = self._size_limit
+            total = self._add_sizes(self._count_size(), self._node_size(node))
+            new_size = self._evaluate_size(self._root_size(None, total), url_safe, formatted, indent)
+            if new_size > max_size:
+                raise SizeLimitExceeded(new_size, max_size)
+            self._size = total
+            self._counted += 1
+        self._hash = hash((self._hash, node.hash))
+        self._elements.append(node)
+
+    @classmethod
+    def _node_hash(cls, node: Node) -> int:
+        if node.hash is not None:
+            return node.hash
+        return hash((node.tag, node.text, tuple(node.attrib.items()) if node.attrib else (),
+                     tuple(cls._node_hash(child) for child in node.children)))
+
+    @classmethod
+    def _same_tree(cls, a: Node, b: Node) -> bool:
+        """Compare the trees field by field, the shared subtrees are compared by identity"""
+        if a is b:
+            return True
+        return a.tag == b.tag and a.text == b.text and len(a.children) == len(b.children) and \
+            (tuple(a.attrib.items()) if a.attrib else ()) == (tuple(b.attrib.items()) if b.attrib else ()) and \
+            all(cls._same_tree(x, y) for x, y in zip(a.children, b.children))
+
+    def _count_size(self) -> Tuple[int, ...]:
+        """The size counters of the elements, the elements added since the previous call are counted"""
+        for node in self._elements[self._counted:]:
+            self._size = self._add_sizes(self._size, self._node_size(node))
+        self._counted = len(self._elements)
+        return self._size
+
+    @staticmethod
+    def _add_sizes(a: Tuple[int, ...], b: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(map(int.__add__, a, b))
+
+    @classmethod
+    def _node_size(cls, node: Node) -> Tuple[int, ...]:
+        """The size counters of the node, cached for the added elements"""
+        if node.size is not None:
+            return node.size
+        if not node.children and not node.attrib:
+            # The leaf elements are the most of the tree: "<Tag>text</Tag>" or "<Tag />" and "<Tag/>\n"
+            tag_length = len(node.tag)
+            if not node.text:
+                return tag_length + 4, 1, tag_length + 4, 1, 1, 0
+            compact, compact_specials, formatted, specials = cls._text_size(node.text)
+            return (compact + 2 * tag_length + 5, compact_specials + 1,
+                    formatted + 2 * tag_length + 6, specials + 1, 1, 0)
+        compact = compact_specials = formatted = specials = lines = depths = 0
+        for child in node.children:
+            size = cls._node_size(child)
+            compact += size[0]
+            compact_specials += size[1]
+            formatted += size[2]
+            specials += size[3]
+            lines += size[4]
+            depths += size[5]
+        size = cls._element_size(node, (compact, compact_specials, formatted, specials, lines, depths),
+                                 bool(node.children))
+        if node.hash is not None:
+            node.size = size
+        return size
+
+    def _root_size(self, root_name: Optional[str], children: Tuple[int, ...]) -> Tuple[int, ...]:
+        root = Node(root_name if root_name else self.__class__.__name__, attrib=self._attributes)
+        return self._element_size(root, children, children[4] > 0)
+
+    @classmethod
+    def _element_size(cls, node: Node, children: Tuple[int, ...], has_children: bool) -> Tuple[int, ...]:
+        """The size counters of the element with the given counters of its children, mirrors the writers"""
+        if node.attrib:
+            compact, compact_specials = cls._measure(cls._start_tag(node, formatted=False), formatted=False)
+            formatted, specials = cls._measure(cls._start_tag(node, formatted=True), formatted=True)
+        else:
+            compact = formatted = len(node.tag) + 1
+            compact_specials = specials = 0
+        text = node.text
+        if text:
+            text_size = cls._text_size(text)
+            compact += text_size[0]
+            compact_specials += text_size[1]
+
+        if text or has_children:
+            compact += children[0] + len(node.tag) + 4
+            compact_specials += children[1] + 1
+        else:
+            compact += 3
+            compact_specials += 1
+
+        if not has_children:
+            if text:
+                formatted += text_size[2] + len(node.tag) + 5
+                specials += text_size[3]
+            else:
+                formatted += 3
+            return compact, compact_specials, formatted, specials + 1, 1, 0
+        formatted += children[2] + len(node.tag) + 6
+        specials += children[3] + 1
+        lines = children[4] + 2
+        depths = children[5] + children[4]
+        if text:
+            formatted += text_size[2] + 1
+            specials += text_size[3]
+            lines += 1
+            depths += 1
+        return compact, compact_specials, formatted, specials, lines, depths
+
+    @classmethod
+    def _text_size(cls, text: str) -> Tuple[int, int, int, int]:
+        """
+        The compact size and URL specials, the formatted size and URL specials of the escaped text. The escaped
+        characters are counted in the UTF-8 bytes instead of escaping the text.
+        """
+        data = text.encode("utf-8")
+        specials = len(data) - len(data.translate(None, cls._URL_SPECIAL_BYTES))
+        escaped = data.translate(None, cls._NOT_ESCAPED_BYTES)
+        amp = angle = quot = line_breaks = 0
+        if escaped:
+            amp = escaped.count(b"&")
+            angle = escaped.count(b"<") + escaped.count(b">")
+            quot = escaped.count(b"\"")
+            line_breaks = data.count(b"\r\n") if b"\r" in escaped else 0
+        compact_specials = specials + amp + 2 * angle
+        formatted = len(data) + 4 * amp + 3 * angle + 5 * quot - line_breaks
+        formatted_specials = compact_specials + 2 * quot
+        if len(data) == len(text):
+            return len(data) + 4 * amp + 3 * angle, compact_specials, formatted, formatted_specials
+        compact, compact_specials = cls._measure(cls._escape_text(text), formatted=False)
+        return compact, compact_specials, formatted, formatted_specials
+
+    @classmethod
+    def _measure(cls, text: str, formatted: bool) -> Tuple[int, int]:
+        """The UTF-8 size of the output part and the number of the characters replaced by the URL encoding"""
+        if not text.isascii():
+            if formatted:
+                return len(text.encode("utf-8")), len(text) - len(text.translate(cls._URL_SPECIALS))
+            text = text.encode("ascii", "xmlcharrefreplace").decode("ascii")
+        return len(text), len(text) - len(text.translate(cls._URL_SPECIALS))
+
+    @staticmethod
+    def _evaluate_size(size: Tuple[int, ...], url_safe: bool, formatted: bool, indent: int) -> int:
+        if formatted:
+            return size[2] + indent * size[5] + (2 * size[3] if url_safe else 0)
+        return size[0] + (2 * size[1] if url_safe else 0)
+
+    @classmethod
+    def _write_cached(cls, node: Node,
+                      write: Callable[[str], object],
+                      mode: tuple,
+                      render: Callable[[Callable[[str], object]], None]):
+        """
+        Write the fragment from the cache if the node is hashed, otherwise render it. The cached tree is compared with
+        the node, so a hash collision renders the node instead of writing the fragment of another tree.
+        """
+        cache = cls.fragment_cache
+        if cache is None or node.hash is None:
+            render(write)
+            return
+        key = (node.hash, mode)
+        entry = cache.get(key)
+        if entry is not None and cls._same_tree(entry[0], node):
+            write(entry[1])
+            return
+        parts: List[str] = list()
+        render(parts.append)
+        fragment = "".join(parts)
+        cache.put(key, node, fragment)
+        write(fragment)
+
+    @classmethod
+    def _write_compact(cls, node: Node, write: Callable[[str], object]):
+        """Write the tree the same way as ElementTree does, without the XML declaration"""
+        cls._write_cached(node, write, ("compact",), lambda w: cls._write_compact_node(node, w))
+
+    @classmethod
+    def _write_canonical(cls, node: Node, write: Callable[[str], object]):
+        cls._write_cached(node, write, ("canonical",), lambda w: cls._write_canonical_node(node, w))
+
+    @classmethod
+    def _write_canonical_node(cls, node: Node, write: Callable[[str], object]):
+        if node.attrib:
+            namespaces = sorted((k, v) for k, v in node.attrib.items() if k == "xmlns" or k.startswith("xmlns:"))
+            attributes = sorted((k, v) for k, v in node.attrib.items() if not (k == "xmlns" or k.startswith("xmlns:")))
+            write("<" + node.tag + "".join(f' {k}="{cls._escape_canonical_attribute(v)}"'
+                                           for k, v in namespaces + attributes) + ">")
+        else:
+            write(f"<{node.tag}>")
+        if node.text:
+            write(cls._escape_text(cls._normalize_newlines(node.text)))
+        for child in node.children:
+            cls._write_canonical(child, write)
+        write(f"</{node.tag}>")
+
+    @classmethod
+    def _start_tag(cls, node: Node, formatted: bool) -> str:
+        """The start tag with the attributes and without the closing bracket"""
+        if not node.attrib:
+            return "<" + node.tag
+        if formatted:
+            attributes = "".join(f' {k}="{cls._escape(v)}"' for k, v in cls._ordered_attributes(node.attrib))
+        else:
+            attributes = "".join(f' {k}="{cls._escape_attribute(v)}"' for k, v in node.attrib.items())
+        return "<" + node.tag + attributes
+
+    @classmethod
+    def _write_compact_node(cls, node: Node, write: Callable[[str], object]):
+        write(cls._start_tag(node, formatted=False))
+        if node.text or node.children:
+            write(">")
+            if node.text:
+                write(cls._escape_text(node.text))
+            for child in node.children:
+                cls._write_compact(child, write)
+            write(f"</{node.tag}>")
+        else:
+            write(" />")
+
+    @classmethod
+    def _write_formatted(cls, node: Node,
+                         write: Callable[[str], object],
+                         add_indent: str,
+                         indent: str = ""):
+        """
+        Write the tree as indented XML in one pass. The layout matches the minidom pretty printer: an element with
+        a single text child is written on one line, any other content is placed on separate indented lines.
+        """
+        cls._write_cached(node, write, ("formatted", add_indent, indent),
+                          lambda w: cls._write_formatted_node(node, w, add_indent, indent))
+
+    @classmethod
+    def _write_formatted_node(cls, node: Node,
+                              write: Callable[[str], object],
+                              add_indent: str,
+                              indent: str):
+        write(indent + cls._start_tag(node, formatted=True))
+
+        if not node.children:
+            if node.text:
+                write(f">{cls._escape(cls._normalize_newlines(node.text))}</{node.tag}>\n")
+            else:
+                write("/>\n")
+            return
+        write(">\n")
+        child_indent = indent + add_indent
+        if node.text:
+            write(child_indent + cls._escape(cls._normalize_newlines(node.text)) + "\n")
+        for child in node.children:
+            cls._write_formatted(child, write, add_indent, child_indent)
+        write(f"{indent}</{node.tag}>\n")
+
+    @staticmethod
+    def _ordered_attributes(attrib: Dict[str, str]) -> List[Tuple[str, str]]:
+        """Namespace declarations go first, the same way a namespace aware parser reports them"""
+        items = list(attrib.items())
+        namespaces = [(k, v) for k, v in items if k == "xmlns" or k.startswith("xmlns:")]
+        if not namespaces:
+            return items
+        return namespaces + [(k, v) for k, v in items if not (k == "xmlns" or k.startswith("xmlns:"))]
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+    @staticmethod
+    def _escape_text(text: str) -> str:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    @staticmethod
+    def _escape_canonical_attribute(text: str) -> str:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace("\t", "&#x9;")\
+            .replace("\n", "&#xA;").replace("\r", "&#xD;")
+
+    @staticmethod
+    def _escape_attribute(text: str) -> str:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\"", "&quot;")\
+            .replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
 
     @staticmethod
-    def _encode_for_url(text: str) -> str:
+    def _normalize_newlines(text: str) -> str:
+        """XML parsers report every line break in character data as a single line feed"""
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    @classmethod
+    def _encode_for_url(cls, text: str) -> str:
         """
         Data must be URL encoded to appear as a single parameter value in the request. Characters that are part of URL
         syntax, such as question marks (?) and ampersands (&), must be replaced with the corresponding URL character
         codes.
         """
-        encoder = [
-            ("$", "%24"),
-            ("&", "%26"),
-            ("+", "%2B"),
-            (",", "%2C"),
-            ("/", "%2F"),
-            (":", "%3A"),
-            (";", "%3B"),
-            ("?", "%3F"),
-            ("@", "%40")
-        ]
-        for char, code in encoder:
-            text = text.replace(char, code)
+        # The replace passes are faster than str.translate with the multi-character replacements
+        for character, code in cls._URL_ENCODING:
+            if character in text:
+                text = text.replace(character, code)
         return text
 
     def compile_elements(self, root_name: Optional[str] = None) -> ET.Element:
@@ -79,12 +670,17 @@ class XMLWrapper(object):
         Returns:
             xml.Element: Generated XML tree with given name
         """
+        return self._compile_node(root_name).to_element()
+
+    def _compile_node(self, root_name: Optional[str] = None) -> Node:
+        """
+        The root node with the current elements, later additions to the wrapper do not change it. The root is not
+        hashed, so the rendered document is not cached. The hash is given when the root is nested into another
+        wrapper.
+        """
         if not root_name:
             root_name = self.__class__.__name__
-        root = ET.Element(root_name, attrib=self._attributes)
-        for element in self._elements:
-            root.append(element)
-        return root
+        return Node(root_name, attrib=dict(self._attributes), children=tuple(self._elements))
 
 
 class Content(XMLWrapper):
@@ -103,9 +699,7 @@ class Content(XMLWrapper):
         Returns:
             Content: The Content object with additional title field
         """
-        element = ET.Element("Title")
-        element.text = title
-        self._elements.append(element)
+        self._append(Node("Title", title))
         return self
 
     def add_text(self, text: str) -> "Content":
@@ -120,9 +714,7 @@ class Content(XMLWrapper):
         Returns:
             Content: The Content object with additional text field
         """
-        element = ET.Element("Text")
-        element.text = text
-        self._elements.append(element)
+        self._append(Node("Text", text))
         return self
 
     def add_formatted_text(self, text: str) -> "Content":
@@ -140,9 +732,7 @@ class Content(XMLWrapper):
         Returns:
             Content: The Content object with additional formatted content field
         """
-        element = ET.Element("FormattedContent")
-        element.text = f"<![CDATA[{text}]]>"
-        self._elements.append(element)
+        self._append(Node("FormattedContent", f"<![CDATA[{text}]]>"))
         return self
 
     def add_list(self, items: List[str]) -> "Content":
@@ -156,11 +746,7 @@ class Content(XMLWrapper):
         Returns:
             Content: The Content object with additional list of elements field
         """
-        list_of_elements = ET.Element("List")
-        for i in items:
-            item = ET.SubElement(list_of_elements, "ListItem")
-            item.text = i
-        self._elements.append(list_of_elements)
+        self._append(Node("List", children=tuple(Node("ListItem", i) for i in items)))
         return self
 
     def add_image(self, url: str, alt_text: str = "image") -> "Content":
@@ -174,22 +760,15 @@ class Content(XMLWrapper):
         Returns:
             Content: The Content object with additional image field
         """
-        element = ET.Element("Binary")
-
-        mime_type_elem = ET.SubElement(element, "MimeType")
-        name = ET.SubElement(mime_type_elem, "Type")
-        name.text = "image"
-        if url.split(".")[-1]:
-            name = ET.SubElement(mime_type_elem, "SubType")
-            name.text = url.split(".")[-1]
-
-        data_url_elem = ET.SubElement(element, "DataURL")
-        data_url_elem.text = url
-
-        alt_text_elem = ET.SubElement(element, "AltText")
-        alt_text_elem.text = alt_text
-
-        self._elements.append(element)
+        mime_type = [Node("Type", "image")]
+        sub_type = url.extension() if isinstance(url, Slot) else url.split(".")[-1]
+        if sub_type:
+            mime_type.append(Node("SubType", sub_type))
+
+        self._append(Node("Binary", children=(
+            Node("MimeType", children=tuple(mime_type)),
+            Node("DataURL", url),
+            Node("AltText", alt_text))))
         return self
 
 
@@ -247,53 +826,46 @@ class FreeTextAnswer(Answer):
                          min_val: Optional[int] = None,
                          max_val: Optional[int] = None):
 
-        constraints = ET.Element("Constraints")
+        constraints = list()
         if reg_exp and not is_numeric:
-            element = self._create_reg_exp(reg_exp, error_text)
-            constraints.append(element)
+            constraints.append(self._create_reg_exp(reg_exp, error_text))
         if any([min_length, max_length]) and not is_numeric:
-            element = self._add_length_constraints(min_length, max_length)
-            constraints.append(element)
+            constraints.append(self._add_length_constraints(min_length, max_length))
         if is_numeric:
-            element = self._create_is_numeric(min_val, max_val)
-            constraints.append(element)
-        self._elements.append(constraints)
+            constraints.append(self._create_is_numeric(min_val, max_val))
+        self._append(Node("Constraints", children=tuple(constraints)))
 
     @staticmethod
-    def _create_reg_exp(reg_exp: str, error_text: Optional[str]) -> ET.Element:
+    def _create_reg_exp(reg_exp: str, error_text: Optional[str]) -> Node:
         attrib = dict()
         attrib["regex"] = reg_exp
         if error_text:
             attrib["errorText"] = error_text
-        return ET.Element("AnswerFormatRegex", attrib=attrib)
+        return Node("AnswerFormatRegex", attrib=attrib)
 
     @staticmethod
-    def _add_length_constraints(min_length: Optional[int], max_length: Optional[int]) -> ET.Element:
+    def _add_length_constraints(min_length: Optional[int], max_length: Optional[int]) -> Node:
         attrib = dict()
         if min_length:
             attrib["minLength"] = str(min_length)
         if max_length:
             attrib["maxLength"] = str(max_length)
-        return ET.Element("Length", attrib=attrib)
+        return Node("Length", attrib=attrib)
 
     @staticmethod
-    def _create_is_numeric(min_val: Optional[int], max_val: Optional[int]) -> ET.Element:
+    def _create_is_numeric(min_val: Optional[int], max_val: Optional[int]) -> Node:
         attrib = dict()
         if min_val:
             attrib["minValue"] = str(min_val)
         if max_val:
             attrib["maxValue"] = str(max_val)
-        return ET.Element("IsNumeric", attrib=attrib)
+        return Node("IsNumeric", attrib=attrib)
 
     def _set_number_of_lines(self, num_lines: int):
-        element = ET.Element("NumberOfLinesSuggestion")
-        element.text = str(num_lines)
-        self._elements.append(element)
+        self._append(Node("NumberOfLinesSuggestion", str(num_lines)))
 
     def _add_text(self, text: str):
-        element = ET.Element("DefaultText")
-        element.text = text
-        self._elements.append(element)
+        self._append(Node("DefaultText", text))
 
 
 class SelectionAnswer(Answer):
@@ -333,41 +905,92 @@ class SelectionAnswer(Answer):
         self._add_selections(selections)
 
     def _add_min_selections(self, number: int):
-        element = ET.Element("MinSelectionCount")
-        element.text = number
-        self._elements.append(element)
+        self._append(Node("MinSelectionCount", str(number)))
 
     def _add_max_selections(self, number: int):
-        element = ET.Element("MaxSelectionCount")
-        element.text = number
-        self._elements.append(element)
+        self._append(Node("MaxSelectionCount", str(number)))
 
     def _add_answer_style(self, style: str):
-        element = ET.Element("StyleSuggestion")
-        element.text = style
-        self._elements.append(element)
+        self._append(Node("StyleSuggestion", style))
 
     def _add_selections(self, selections: Dict[str, str]):
-        element = ET.Element("Selections")
-        for i, s in selections.items():
-            item = ET.SubElement(element, "Selection")
-            sel_id = ET.SubElement(item, "SelectionIdentifier")
-            sel_id.text = i
-            text = ET.SubElement(item, "Text")
-            text.text = s
-        self._elements.append(element)
+        self._append(Node("Selections", children=tuple(
+            Node("Selection", children=(Node("SelectionIdentifier", i), Node("Text", s)))
+            for i, s in selections.items())))
+
+
+class IDAllocator(object):
+    """Thread-safe counter of the generated question identifiers"""
+
+    def __init__(self, start: int = 1):
+        self._next = start
+        self._lock = Lock()
+
+    def allocate(self) -> int:
+        with self._lock:
+            number = self._next
+            self._next += 1
+            return number
+
+    def __getstate__(self) -> dict:
+        """The lock is not picklable, so the forms could not be sent to the process pool"""
+        return {"_next": self._next}
+
+    def __setstate__(self, state: dict):
+        self._next = state["_next"]
+        self._lock = Lock()
+
+
+_ID_ALLOCATOR: "ContextVar[Optional[IDAllocator]]" = ContextVar("question_id_allocator", default=None)
+
+
+@contextmanager
+def question_id_scope(allocator: Optional[IDAllocator] = None) -> Iterator[IDAllocator]:
+    """
+    Number the Questions created in the context (of the current thread or asyncio task) with the given allocator.
+    The numbering in the scope does not depend on the other forms, so the same code builds the same XML on any thread.
+
+    Args:
+        allocator (Optional[IDAllocator]): The allocator, e.g. QuestionForm.question_ids. If None the new allocator
+            starting from 1 is used
+
+    Returns:
+        Iterator[IDAllocator]: The allocator of the scope
+    """
+    allocator = allocator if allocator else IDAllocator()
+    token = _ID_ALLOCATOR.set(allocator)
+    try:
+        yield allocator
+    finally:
+        _ID_ALLOCATOR.reset(token)
 
 
 class Question(XMLWrapper):
-    _ID = 1
+    # Used outside of question_id_scope
+    _IDS = IDAllocator()
 
     def __init__(self, content: Content,
                  answer: Answer,
                  name: Optional[str] = None,
                  is_required: bool = False,
-                 question_id: Optional[str] = None):
+                 question_id: Optional[str] = None,
+                 id_allocator: Optional[IDAllocator] = None):
+        """
+        Create new question.
+
+        Args:
+            content (Content): The question content
+            answer (Answer): The answer specification
+            name (Optional[str]): The display name of the question
+            is_required (bool): Specifies whether the Worker must answer the question
+            question_id (Optional[str]): The question identifier. If None it is generated by the id_allocator
+            id_allocator (Optional[IDAllocator]): The allocator of the generated identifiers. If None the allocator of
+                the current question_id_scope or the process-wide one is used
+        """
         super().__init__()
-        self._question_id = question_id if question_id else f"QuestionID_{self._ID}"
+        allocator = id_allocator or _ID_ALLOCATOR.get() or self._IDS
+        number = allocator.allocate()
+        self._question_id = question_id if question_id else f"QuestionID_{number}"
         self._add_id()
         if name:
             self._add_name(name)
@@ -380,28 +1003,19 @@ class Question(XMLWrapper):
         return self._question_id
 
     def _add_id(self):
-        element = ET.Element("QuestionIdentifier")
-        element.text = self._question_id
-        self.__class__._ID += 1
-        self._elements.append(element)
+        self._append(Node("QuestionIdentifier", self._question_id))
 
     def _add_name(self, name: str):
-        element = ET.Element("DisplayName")
-        element.text = name
-        self._elements.append(element)
+        self._append(Node("DisplayName", name))
 
     def _add_is_required(self, is_required: bool):
-        element = ET.Element("IsRequired")
-        element.text = "true" if is_required else "false"
-        self._elements.append(element)
+        self._append(Node("IsRequired", "true" if is_required else "false"))
 
     def _add_content(self, content: Content):
-        self._elements.append(content.compile_elements("QuestionContent"))
+        self._append(content._compile_node("QuestionContent"))
 
     def _add_answer(self, answer: Answer):
-        element = ET.Element("AnswerSpecification")
-        element.append(answer.compile_elements())
-        self._elements.append(element)
+        self._append(Node("AnswerSpecification", children=(answer._compile_node(),)))
 
 
 class QuestionForm(XMLWrapper):
@@ -415,6 +1029,8 @@ class QuestionForm(XMLWrapper):
         super().__init__()
         self._attributes["xmlns"] = \
             "http://mechanicalturk.amazonaws.com/AWSMechanicalTurkDataSchemas/2017-11-06/QuestionForm.xsd"
+        # The allocator of the form questions, see question_id_scope
+        self.question_ids = IDAllocator()
 
     def add_overview(self, overview: Content) -> "QuestionForm":
         """
@@ -428,7 +1044,7 @@ class QuestionForm(XMLWrapper):
         Returns:
             QuestionForm: Return self with updated field.
         """
-        self._elements.append(overview.compile_elements("Overview"))
+        self._append(overview._compile_node("Overview"))
         return self
 
     def add_question(self, question: Question) -> "QuestionForm":
@@ -441,10 +1057,89 @@ class QuestionForm(XMLWrapper):
         Returns:
             QuestionForm: Return self with updated field.
         """
-        self._elements.append(question.compile_elements("Question"))
+        self._append(question._compile_node("Question"))
         return self
 
 
+class QuestionFormWriter(object):
+    """
+    Writes the QuestionForm into the file while the Overviews and Questions are added, so the memory does not depend
+    on the length of the form. The output is the same as QuestionForm.save gives.
+    """
+
+    def __init__(self, file: Union[str, TextIO],
+                 url_safe: bool = False,
+                 formatted: bool = True,
+                 indent: int = 4):
+        """
+        Create new writer.
+
+        Args:
+            file (Union[str, TextIO]): The file path or the opened text file
+            url_safe (bool): Encode the output for using it in the URL
+            formatted (bool): Write indented XML
+            indent (int): Number of spaces for one level of the indentation
+        """
+        self._owns_file = isinstance(file, str)
+        # Written in UTF-8 without the newline translation, the same way as save writes the file
+        self._file: TextIO = open(file, "w", encoding="utf-8", newline="") if self._owns_file else file
+        self._url_safe = url_safe
+        self._formatted = formatted
+        self._indent = " " * indent
+        self._form = QuestionForm()
+        # The allocator of the form questions, see question_id_scope
+        self.question_ids = self._form.question_ids
+        self._root = self._form._compile_node()
+        self._started = False
+        self._closed = False
+
+    def __enter__(self) -> "QuestionFormWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_overview(self, overview: Content) -> "QuestionFormWriter":
+        """Write the Overview element, see QuestionForm.add_overview"""
+        self._write_child(overview._compile_node("Overview"))
+        return self
+
+    def add_question(self, question: Question) -> "QuestionFormWriter":
+        """Write the Question element, see QuestionForm.add_question"""
+        self._write_child(question._compile_node("Question"))
+        return self
+
+    def close(self):
+        """Write the end of the form and close the file if it was opened by the writer"""
+        if self._closed:
+            return
+        if self._started:
+            self._write(f"</{self._root.tag}>\n" if self._formatted else f"</{self._root.tag}>")
+        else:
+            parts: List[str] = list()
+            QuestionForm._write_tree(self._root, parts.append, self._formatted, len(self._indent))
+            self._write("".join(parts))
+        self._closed = True
+        if self._owns_file:
+            self._file.close()
+
+    def _write_child(self, node: Node):
+        assert not self._closed, "The writer is already closed"
+        node.hash = QuestionForm._node_hash(node)
+        parts: List[str] = list()
+        if not self._started:
+            parts.append(QuestionForm._start_tag(self._root, self._formatted) + (">\n" if self._formatted else ">"))
+            self._started = True
+        if self._formatted:
+            QuestionForm._write_formatted(node, parts.append, self._indent, self._indent)
+        else:
+            QuestionForm._write_compact(node, parts.append)
+        self._write("".join(parts))
+
+    def _write(self, text: str):
+        self._file.write(QuestionForm._finalize(text, self._url_safe, self._formatted))
+
+
 class AnswerKey(XMLWrapper):
     def __init__(self):
         super().__init__()
@@ -455,12 +1150,8 @@ class AnswerKey(XMLWrapper):
     def add_max_score(self, score: int) -> "AnswerKey":
         assert not self._is_score_added, "Score was already added to the answers"
 
-        element = ET.Element("QualificationValueMapping")
-        percentage = ET.SubElement(element, "PercentageMapping")
-        max_score = ET.SubElement(percentage, "MaximumSummedScore")
-        max_score.text = str(score)
-
-        self._elements.append(element)
+        self._append(Node("QualificationValueMapping", children=(
+            Node("PercentageMapping", children=(Node("MaximumSummedScore", str(score)),)),)))
         self._is_score_added = True
         return self
 
@@ -472,33 +1163,23 @@ class AnswerKey(XMLWrapper):
             question (Question): The Question object for whom the answers are prepared
             keys (Dict[int, List[str]]): The keys dictionary {answer_score: [the_options_which_fit_for_the_score]}
         """
-        element = ET.Element("Question")
-        element.append(self._create_question_id(question.id))
-        element.extend(self._create_question_keys(keys))
-        self._elements.append(element)
+        children = [self._create_question_id(question.id)]
+        children.extend(self._create_question_keys(keys))
+        self._append(Node("Question", children=tuple(children)))
         return self
 
     @staticmethod
-    def _create_question_id(question_id: str) -> ET.Element:
-        element = ET.Element("QuestionIdentifier")
-        element.text = question_id
-        return element
+    def _create_question_id(question_id: str) -> Node:
+        return Node("QuestionIdentifier", question_id)
 
     @staticmethod
-    def _create_question_keys(keys: Dict[int, List[str]]) -> List[ET.Element]:
-        elements = list()
+    def _create_question_keys(keys: Dict[int, List[str]]) -> List[Node]:
+        nodes = list()
         for score, answers in keys.items():
-            option = ET.Element("AnswerOption")
-
-            for a in answers:
-                answer_element = ET.SubElement(option, "SelectionIdentifier")
-                answer_element.text = a
-
-            score_element = ET.SubElement(option, "AnswerScore")
-            score_element.text = str(score)
-
-            elements.append(option)
-        return elements
+            options = [Node("SelectionIdentifier", a) for a in answers]
+            options.append(Node("AnswerScore", str(score)))
+            nodes.append(Node("AnswerOption", children=tuple(options)))
+        return nodes
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""
+The public names are imported on first use, so importing the package does not load boto3 until it is needed.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "AsyncMTurkClient": "pymechturk.requester.async_client",
+    "TokenBucket": "pymechturk.requester.async_client",
+    "create_client": "pymechturk.requester.client",
+    "get_client": "pymechturk.requester.client",
+    "ClientFactory": "pymechturk.requester.client",
+    "PageIterator": "pymechturk.requester.pagination",
+    "list_hits": "pymechturk.requester.pagination",
+    "list_assignments_for_hit": "pymechturk.requester.pagination",
+    "list_assignments_for_hits": "pymechturk.requester.pagination",
+    "list_qualification_requests": "pymechturk.requester.pagination",
+    "LocalMTurkServer": "pymechturk.requester.local_server",
+    "LocalServiceError": "pymechturk.requester.local_server",
+    "QualificationTypeCache": "pymechturk.requester.qualification_cache",
+    "qualification_key": "pymechturk.requester.qualification_cache",
+    "BulkQualificationEngine": "pymechturk.requester.bulk",
+    "BulkProgress": "pymechturk.requester.bulk",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from pymechturk.requester.async_client import AsyncMTurkClient, TokenBucket
+    from pymechturk.requester.client import create_client, get_client, ClientFactory
+    from pymechturk.requester.pagination import PageIterator, list_hits, list_assignments_for_hit,\
+        list_assignments_for_hits, list_qualification_requests
+    from pymechturk.requester.local_server import LocalMTurkServer, LocalServiceError
+    from pymechturk.requester.qualification_cache import QualificationTypeCache, qualification_key
+    from pymechturk.requester.bulk import BulkQualificationEngine, BulkProgress
+
+
+def __getattr__(name: str):
+    """Import the public name on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,299 @@
+"""
+Asyncio client of the MTurk requester API.
+
+The boto3 client is blocking, so the calls run in a thread pool whose size is the concurrency cap and the HTTP
+connection pool of the client has the same size. The request rate is limited by a token bucket and the throttled
+requests are retried with the exponential backoff and full jitter.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from typing import Optional, Any, Dict, Iterable, AsyncIterator, Tuple, Union, Callable
+from weakref import WeakKeyDictionary
+
+from botocore.exceptions import ClientError
+
+from pymechturk.config import Environment, Sandbox, AmazonIAMUser
+from pymechturk.qualification.data_classes import QualificationType
+from pymechturk.requester.client import ClientFactory, default_factory, is_throttling, backoff_delay
+from pymechturk.requester.qualification_cache import QualificationTypeCache
+
+
+def _loop_local(objects: WeakKeyDictionary, create: Callable[[], Any]) -> Any:
+    """
+    The object of the running event loop. The asyncio primitives are bound to the loop they are created in, so the
+    client used by many asyncio.run calls has one of them per loop.
+    """
+    loop = asyncio.get_running_loop()
+    obj = objects.get(loop)
+    if obj is None:
+        obj = objects[loop] = create()
+    return obj
+
+
+class TokenBucket(object):
+    """
+    Rate limiter allowing bursts up to the capacity and the given average rate. If the minimum rate is lower than
+    the rate, the rate adapts to the throttling: it is halved (at most once per second, the requests in flight are
+    throttled together) and grows back linearly, from the minimum to the maximum in about RECOVERY_SECONDS.
+    """
+
+    RECOVERY_SECONDS = 20
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: Optional[float] = None):
+        """
+        Create new bucket.
+
+        Args:
+            rate (float): Number of tokens added per second
+            capacity (Optional[float]): Maximum number of tokens. If None it equals the rate
+            min_rate (Optional[float]): The lower bound of the adaptive rate. If None the rate is fixed
+        """
+        assert rate > 0, f"rate should be positive, received {rate}"
+        assert min_rate is None or 0 < min_rate <= rate, f"min_rate should be in (0, {rate}], received {min_rate}"
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate else rate
+        self.capacity = capacity if capacity else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._decreased = 0.0
+        self._locks: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = WeakKeyDictionary()
+
+    async def acquire(self):
+        """Wait for one token"""
+        async with _loop_local(self._locks, asyncio.Lock):
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttled(self):
+        """Halve the adaptive rate"""
+        now = time.monotonic()
+        if now - self._decreased >= 1.0:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._decreased = now
+
+    def succeeded(self):
+        """Increase the adaptive rate, the successful requests of one second add max_rate / RECOVERY_SECONDS"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / (self.RECOVERY_SECONDS * self.rate))
+
+
+class AsyncMTurkClient(object):
+    """Concurrent MTurk requester client"""
+
+    def __init__(self, user: AmazonIAMUser,
+                 environment: Environment = Sandbox(),
+                 max_concurrency: int = 20,
+                 requests_per_second: float = 10.0,
+                 min_requests_per_second: Optional[float] = None,
+                 max_retries: int = 8,
+                 base_delay: float = 0.1,
+                 max_delay: float = 20.0,
+                 region: str = "us-east-1",
+                 qualification_cache: Optional[QualificationTypeCache] = None,
+                 client_factory: Optional[ClientFactory] = None):
+        """
+        Create new client.
+
+        Args:
+            user (AmazonIAMUser): The credentials of the requester
+            environment (Environment): The MTurk endpoint, Sandbox by default
+            max_concurrency (int): Maximum number of requests in flight and the size of the connection pool
+            requests_per_second (float): The average request rate
+            min_requests_per_second (Optional[float]): If set the request rate adapts to the throttling between
+                this value and requests_per_second, see TokenBucket
+            max_retries (int): Number of retries of the throttled request
+            base_delay (float): The first retry delay in seconds, doubled with every retry
+            max_delay (float): The upper bound of the retry delay in seconds
+            region (str): AWS region of the endpoint
+            qualification_cache (Optional[QualificationTypeCache]): The cache of the created qualification types,
+                the identical types are created once
+            client_factory (Optional[ClientFactory]): The pool of the boto3 clients, the clients with the same
+                credentials, endpoint, concurrency and region are reused. If None the default factory is used
+        """
+        assert max_concurrency > 0, f"max_concurrency should be positive, received {max_concurrency}"
+        self.environment = environment
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = TokenBucket(requests_per_second, min_rate=min_requests_per_second)
+        self.qualification_cache = qualification_cache
+        # The qualification types are created separately for every account and endpoint
+        self.scope = f"{user.access_key_id}@{environment.endpoint}"
+        factory = client_factory if client_factory else default_factory
+        self._client = factory.get(user, environment, max_pool_connections=max_concurrency, region=region)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+    async def __aenter__(self) -> "AsyncMTurkClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        """
+        Call the API operation, the throttled calls are retried.
+
+        Args:
+            operation (str): The boto3 method name, e.g. 'create_hit'
+            **kwargs: The request parameters
+
+        Returns:
+            Dict[str, Any]: The response
+        """
+        semaphore = _loop_local(self._semaphores, partial(asyncio.Semaphore, self.max_concurrency))
+        method = partial(getattr(self._client, operation), **kwargs)
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                async with semaphore:
+                    response = await loop.run_in_executor(self._executor, method)
+                self.rate_limiter.succeeded()
+                return response
+            except ClientError as error:
+                if not is_throttling(error):
+                    raise
+                self.rate_limiter.throttled()
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+            attempt += 1
+
+    async def call_many(self, operation: str,
+                        requests: Iterable[Dict[str, Any]],
+                        ordered: bool = False) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """
+        Call the API operation for every request. Only max_concurrency requests are read from the iterable ahead.
+        The requests in flight are cancelled if the iteration is stopped early.
+
+        Args:
+            operation (str): The boto3 method name, e.g. 'create_hit'
+            requests (Iterable[Dict[str, Any]]): The request parameters
+            ordered (bool): Yield the responses in the order of the requests. Otherwise as soon as they are received
+
+        Returns:
+            AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]: The request index and the response or
+                the error of the request, CancelledError if the request was cancelled
+        """
+        pending: Dict[asyncio.Task, int] = dict()
+        iterator = enumerate(requests)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_concurrency:
+                    item = next(iterator, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, request = item
+                    pending[asyncio.ensure_future(self.call(operation, **request))] = index
+                if not pending:
+                    return
+                if ordered:
+                    done = [min(pending, key=pending.get)]
+                    await asyncio.wait(done)
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=pending.get):
+                    index = pending.pop(task)
+                    if task.cancelled():
+                        yield index, asyncio.CancelledError()
+                    else:
+                        yield index, task.exception() or task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def create_hit(self, **kwargs) -> Dict[str, Any]:
+        return (await self.call("create_hit", **kwargs))["HIT"]
+
+    def create_hits(self, requests: Iterable[Dict[str, Any]],
+                    ordered: bool = False) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        return self.call_many("create_hit", requests, ordered)
+
+    async def create_qualification_type(self, qualification: QualificationType) -> QualificationType:
+        """
+        Create the qualification type. If the qualification cache is set the identical type created before is
+        returned without calling the API.
+
+        Args:
+            qualification (QualificationType): The qualification type without QualificationTypeId
+
+        Returns:
+            QualificationType: The copy of the qualification type with QualificationTypeId and CreationTime
+        """
+        cache = self.qualification_cache
+        if cache is None:
+            response = await self.call("create_qualification_type", **self.qualification_request(qualification))
+            return self.qualification_from_response(qualification, response)
+
+        # The cache calls block, they can wait for another process creating the same type
+        loop = asyncio.get_running_loop()
+        cached, claim = await loop.run_in_executor(None, cache.claim, qualification, self.scope)
+        if cached is not None:
+            return cached
+        try:
+            response = await self.call("create_qualification_type", **self.qualification_request(qualification))
+        except BaseException:
+            await loop.run_in_executor(None, cache.release, qualification, claim, self.scope)
+            raise
+        created = self.qualification_from_response(qualification, response)
+        await loop.run_in_executor(None, cache.store, created, claim, self.scope)
+        return created
+
+    def create_qualification_types(self, qualifications: Iterable[QualificationType],
+                                   ordered: bool = False
+                                   ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """Create many qualification types and yield the responses, the qualification cache is not used"""
+        return self.call_many("create_qualification_type", map(self.qualification_request, qualifications), ordered)
+
+    async def associate_qualification_with_worker(self, qualification_type_id: str,
+                                                  worker_id: str,
+                                                  value: int = 1,
+                                                  send_notification: bool = False) -> Dict[str, Any]:
+        return await self.call("associate_qualification_with_worker", QualificationTypeId=qualification_type_id,
+                               WorkerId=worker_id, IntegerValue=value, SendNotification=send_notification)
+
+    def associate_qualification_with_workers(self, qualification_type_id: str,
+                                             worker_ids: Iterable[str],
+                                             value: int = 1,
+                                             send_notification: bool = False,
+                                             ordered: bool = False
+                                             ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        requests = (dict(QualificationTypeId=qualification_type_id, WorkerId=worker_id, IntegerValue=value,
+                         SendNotification=send_notification) for worker_id in worker_ids)
+        return self.call_many("associate_qualification_with_worker", requests, ordered)
+
+    @staticmethod
+    def qualification_request(qualification: QualificationType) -> Dict[str, Any]:
+        """The CreateQualificationType parameters of the qualification type, IsRequestable is set by the service"""
+        request = asdict(qualification)
+        del request["QualificationTypeId"]
+        del request["CreationTime"]
+        del request["IsRequestable"]
+        return {k: v for k, v in request.items() if v is not None}
+
+    @staticmethod
+    def qualification_from_response(qualification: QualificationType, response: Dict[str, Any]) -> QualificationType:
+        created = response["QualificationType"]
+        fields = asdict(qualification)
+        fields["QualificationTypeId"] = created["QualificationTypeId"]
+        fields["CreationTime"] = created.get("CreationTime")
+        return QualificationType(**fields)
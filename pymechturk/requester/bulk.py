@@ -0,0 +1,232 @@
+"""
+Bulk grant and revoke of a qualification for many workers.
+
+The requests run concurrently through AsyncMTurkClient, its connection pool and rate limiter bound the parallelism,
+and its adaptive rate backs off on throttling. Every finished worker is appended to the journal file, so the
+interrupted run started again with the same journal skips the workers which are already done.
+
+    async with AsyncMTurkClient(user, max_concurrency=50, requests_per_second=50, min_requests_per_second=5) as client:
+        engine = BulkQualificationEngine(client, qualification, journal="grant.journal", on_progress=print)
+        result = await engine.grant("workers.txt", value=1)
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Union, Iterable, Iterator, Callable, Dict, List, Tuple, Set, Any, TextIO
+
+from botocore.exceptions import ClientError
+
+from pymechturk.qualification.data_classes import QualificationType
+from pymechturk.requester.async_client import AsyncMTurkClient
+
+GRANT = "grant"
+REVOKE = "revoke"
+
+
+@dataclass
+class BulkProgress:
+    operation: str
+    succeeded: int = 0
+    failed: int = 0
+    # The workers done by the previous runs of the journal
+    skipped: int = 0
+    seconds: float = 0.0
+    # The worker identifier and the error code of the failed requests
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def throughput(self) -> float:
+        """The requests per second of this run"""
+        return self.done / self.seconds if self.seconds else 0.0
+
+
+class _Journal(object):
+    """Append-only log of the finished workers: a header line, then 'ok<TAB>worker' or 'failed<TAB>worker<TAB>code'"""
+
+    def __init__(self, path: str, header: str, flush_interval: float):
+        self.path = path
+        self.header = header
+        self.flush_interval = flush_interval
+        self._file: Optional[TextIO] = None
+        self._flushed = time.monotonic()
+
+    def load(self) -> Set[str]:
+        """The workers succeeded in the previous runs"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return set()
+        done: Set[str] = set()
+        with open(self.path, "r") as file:
+            header = file.readline().rstrip("\n")
+            assert header == self.header, \
+                f"The journal {self.path} belongs to another operation: '{header}', expected '{self.header}'"
+            for line in file:
+                if not line.endswith("\n"):
+                    # The line was cut by the crash
+                    break
+                status, _, worker_id = line.rstrip("\n").partition("\t")
+                if status == "ok":
+                    done.add(worker_id)
+        return done
+
+    def open(self):
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, "a")
+        if not exists:
+            self._file.write(self.header + "\n")
+        else:
+            self._terminate_cut_line()
+
+    def _terminate_cut_line(self):
+        with open(self.path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                self._file.write("\n")
+
+    def write(self, line: str):
+        self._file.write(line + "\n")
+        now = time.monotonic()
+        if now - self._flushed >= self.flush_interval:
+            self._file.flush()
+            self._flushed = now
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_worker_ids(path: str) -> Iterator[str]:
+    """The worker identifiers of the file, one per line. The empty lines and the lines starting with '#' are skipped"""
+    with open(path, "r") as file:
+        for line in file:
+            worker_id = line.strip()
+            if worker_id and not worker_id.startswith("#"):
+                yield worker_id
+
+
+class BulkQualificationEngine(object):
+    """Grants or revokes the qualification type for many workers concurrently"""
+
+    def __init__(self, client: AsyncMTurkClient,
+                 qualification: Union[QualificationType, str],
+                 journal: Optional[str] = None,
+                 on_progress: Optional[Callable[[BulkProgress], None]] = None,
+                 progress_interval: float = 5.0,
+                 flush_interval: float = 1.0):
+        """
+        Create new engine.
+
+        Args:
+            client (AsyncMTurkClient): The client, its max_concurrency and requests_per_second bound the run.
+                Set its min_requests_per_second to adapt the rate to the throttling
+            qualification (Union[QualificationType, str]): The created qualification type or its identifier
+            journal (Optional[str]): The checkpoint file. If it exists the workers done by the previous runs are
+                skipped. If None the run can not be resumed
+            on_progress (Optional[Callable[[BulkProgress], None]]): Called with the progress every
+                progress_interval seconds and at the end of the run
+            progress_interval (float): The interval of the progress reports in seconds
+            flush_interval (float): The interval of writing the journal to the disk in seconds, the workers done
+                after the last flush are processed again by the resumed run
+        """
+        qualification_type_id = qualification.QualificationTypeId if isinstance(qualification, QualificationType) \
+            else qualification
+        assert qualification_type_id, "The qualification type should be created first"
+        self.client = client
+        self.qualification_type_id = qualification_type_id
+        self.journal = journal
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.flush_interval = flush_interval
+
+    async def grant(self, workers: Union[Iterable[str], str],
+                    value: int = 1,
+                    send_notification: bool = False) -> BulkProgress:
+        """
+        Grant the qualification to the workers, the workers who have it get the new value.
+
+        Args:
+            workers (Union[Iterable[str], str]): The worker identifiers or the file with one identifier per line
+            value (int): The qualification value
+            send_notification (bool): Notify the workers by email
+
+        Returns:
+            BulkProgress: The counts, the failures and the throughput of the run
+        """
+        return await self._run(GRANT, f"{GRANT}\t{self.qualification_type_id}\t{value}", workers,
+                               lambda worker_id: dict(QualificationTypeId=self.qualification_type_id,
+                                                      WorkerId=worker_id, IntegerValue=value,
+                                                      SendNotification=send_notification))
+
+    async def revoke(self, workers: Union[Iterable[str], str], reason: Optional[str] = None) -> BulkProgress:
+        """
+        Revoke the qualification from the workers.
+
+        Args:
+            workers (Union[Iterable[str], str]): The worker identifiers or the file with one identifier per line
+            reason (Optional[str]): The message sent to the workers
+
+        Returns:
+            BulkProgress: The counts, the failures and the throughput of the run
+        """
+        extra = dict(Reason=reason) if reason else dict()
+        return await self._run(REVOKE, f"{REVOKE}\t{self.qualification_type_id}", workers,
+                               lambda worker_id: dict(QualificationTypeId=self.qualification_type_id,
+                                                      WorkerId=worker_id, **extra))
+
+    async def _run(self, operation: str,
+                   header: str,
+                   workers: Union[Iterable[str], str],
+                   request: Callable[[str], Dict[str, Any]]) -> BulkProgress:
+        method = "associate_qualification_with_worker" if operation == GRANT \
+            else "disassociate_qualification_from_worker"
+        progress = BulkProgress(operation)
+        journal = _Journal(self.journal, header, self.flush_interval) if self.journal else None
+        done = journal.load() if journal else set()
+        # The identifiers of the requests in flight by the request index
+        pending: Dict[int, str] = dict()
+
+        def requests() -> Iterator[Dict[str, Any]]:
+            seen: Set[str] = set()
+            for worker_id in read_worker_ids(workers) if isinstance(workers, str) else workers:
+                if worker_id in done or worker_id in seen:
+                    progress.skipped += worker_id in done
+                    continue
+                seen.add(worker_id)
+                pending[len(seen) - 1] = worker_id
+                yield request(worker_id)
+
+        start = time.monotonic()
+        reported = start
+        if journal:
+            journal.open()
+        try:
+            async for index, response in self.client.call_many(method, requests()):
+                worker_id = pending.pop(index)
+                if isinstance(response, Exception):
+                    code = response.response.get("Error", {}).get("Code", "Unknown") \
+                        if isinstance(response, ClientError) else type(response).__name__
+                    progress.failed += 1
+                    progress.failures.append((worker_id, code))
+                    line = f"failed\t{worker_id}\t{code}"
+                else:
+                    progress.succeeded += 1
+                    line = f"ok\t{worker_id}"
+                if journal:
+                    journal.write(line)
+                now = time.monotonic()
+                if self.on_progress and now - reported >= self.progress_interval:
+                    progress.seconds = now - start
+                    self.on_progress(progress)
+                    reported = now
+        finally:
+            if journal:
+                journal.close()
+        progress.seconds = time.monotonic() - start
+        if self.on_progress:
+            self.on_progress(progress)
+        return progress
@@ -0,0 +1,187 @@
+import os
+import random
+import threading
+import time
+from typing import Optional, Any, Callable, Dict, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from pymechturk.config import Environment, Sandbox, AmazonIAMUser
+
+THROTTLING_ERRORS = ("Throttling", "ThrottlingException", "TooManyRequestsException", "ServiceUnavailable")
+
+
+def create_client(user: AmazonIAMUser,
+                  environment: Environment = Sandbox(),
+                  max_pool_connections: int = 10,
+                  max_attempts: int = 0,
+                  region: str = "us-east-1") -> Any:
+    """
+    Create new boto3 MTurk client, see get_client for the pooled one.
+
+    Args:
+        user (AmazonIAMUser): The credentials of the requester
+        environment (Environment): The MTurk endpoint, Sandbox by default
+        max_pool_connections (int): Size of the HTTP connection pool
+        max_attempts (int): Number of botocore retries, the callers of this package retry by themselves
+        region (str): AWS region of the endpoint
+
+    Returns:
+        MTurk.Client: The boto3 client
+    """
+    return boto3.client(
+        "mturk",
+        aws_access_key_id=user.access_key_id,
+        aws_secret_access_key=user.secret_access_key,
+        region_name=region,
+        endpoint_url=environment.endpoint,
+        config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": max_attempts}))
+
+
+class ClientFactory(object):
+    """
+    Pool of ready boto3 MTurk clients keyed on the environment and the credentials. The clients of a process are
+    created from one boto3 session, so the service model is loaded once, and every process creates its own clients,
+    so the factory can be shared with the forked workers or sent to the process pool.
+    """
+
+    def __init__(self, max_pool_connections: int = 10,
+                 max_attempts: int = 0,
+                 region: str = "us-east-1",
+                 per_thread: bool = False):
+        """
+        Create new factory, the clients are created on first use.
+
+        Args:
+            max_pool_connections (int): Size of the HTTP connection pool of the clients
+            max_attempts (int): Number of botocore retries, the callers of this package retry by themselves
+            region (str): AWS region of the endpoints
+            per_thread (bool): Give every thread its own client. The boto3 clients are thread-safe, so by default the
+                threads of a process share the client and its connection pool
+        """
+        self.max_pool_connections = max_pool_connections
+        self.max_attempts = max_attempts
+        self.region = region
+        self.per_thread = per_thread
+        self._reset()
+
+    def __getstate__(self) -> dict:
+        """The clients and the lock are not picklable, the unpickled factory creates its own clients"""
+        return {"max_pool_connections": self.max_pool_connections, "max_attempts": self.max_attempts,
+                "region": self.region, "per_thread": self.per_thread}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._session: Optional[boto3.session.Session] = None
+        self._clients: Dict[Tuple, Any] = dict()
+        self._local = threading.local()
+
+    def get(self, user: AmazonIAMUser,
+            environment: Environment = Sandbox(),
+            max_pool_connections: Optional[int] = None,
+            region: Optional[str] = None) -> Any:
+        """
+        Get the client of the current process (or thread if per_thread), it is created on the first call.
+
+        Args:
+            user (AmazonIAMUser): The credentials of the requester
+            environment (Environment): The MTurk endpoint, Sandbox by default
+            max_pool_connections (Optional[int]): Size of the HTTP connection pool. If None the factory value is used
+            region (Optional[str]): AWS region of the endpoint. If None the factory value is used
+
+        Returns:
+            MTurk.Client: The boto3 client
+        """
+        if self._pid != os.getpid():
+            # The clients, the session and the lock of the parent process are not used after fork
+            self._reset()
+        key = (environment.endpoint, user.access_key_id, user.secret_access_key,
+               max_pool_connections or self.max_pool_connections, region or self.region)
+        clients = self._thread_clients() if self.per_thread else self._clients
+        client = clients.get(key)
+        if client is None:
+            with self._lock:
+                client = clients.get(key)
+                if client is None:
+                    client = clients[key] = self._create(key)
+        return client
+
+    def clear(self):
+        """Drop the created clients, e.g. after the credentials were rotated"""
+        self._reset()
+
+    def _thread_clients(self) -> Dict[Tuple, Any]:
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = dict()
+        return clients
+
+    def _create(self, key: Tuple) -> Any:
+        """Create the client, the boto3 session is not thread-safe so it is called under the lock"""
+        endpoint, access_key_id, secret_access_key, max_pool_connections, region = key
+        if self._session is None:
+            self._session = boto3.session.Session()
+        return self._session.client(
+            "mturk",
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+            endpoint_url=endpoint,
+            config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": self.max_attempts}))
+
+
+# The factory of the clients of this package, e.g. of AsyncMTurkClient
+default_factory = ClientFactory()
+
+
+def get_client(user: AmazonIAMUser,
+               environment: Environment = Sandbox(),
+               max_pool_connections: Optional[int] = None,
+               region: Optional[str] = None) -> Any:
+    """The pooled client of the default factory, see ClientFactory.get"""
+    return default_factory.get(user, environment, max_pool_connections, region)
+
+
+def is_throttling(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in THROTTLING_ERRORS
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(method: Callable[..., Dict[str, Any]],
+                    max_retries: int = 8,
+                    base_delay: float = 0.1,
+                    max_delay: float = 20.0,
+                    **kwargs) -> Dict[str, Any]:
+    """
+    Call the client method, the throttled calls are retried.
+
+    Args:
+        method (Callable): The boto3 client method
+        max_retries (int): Number of retries of the throttled call
+        base_delay (float): The first retry delay in seconds, doubled with every retry
+        max_delay (float): The upper bound of the retry delay in seconds
+        **kwargs: The request parameters
+
+    Returns:
+        Dict[str, Any]: The response
+    """
+    attempt = 0
+    while True:
+        try:
+            return method(**kwargs)
+        except ClientError as error:
+            if not is_throttling(error) or attempt >= max_retries:
+                raise
+        time.sleep(backoff_delay(attempt, base_delay, max_delay))
+        attempt += 1
@@ -0,0 +1,460 @@
+"""
+Local stand-in of the MTurk requester API for the load and throughput tests.
+
+The server speaks the JSON protocol of the MTurk endpoint, so the boto3 client created for the Local environment
+talks to it without any change. The state is kept in memory. The latency, the throttling and the service errors are
+injected with the configured rates, so the retries and the throughput of the clients can be measured offline.
+
+    with LocalMTurkServer(latency=0.05, requests_per_second=5, error_rate=0.01) as server:
+        client = create_client(user, server.environment)
+        client.create_hit(**request)
+
+The server can also be started from the command line:
+    python -m pymechturk.requester.local_server --port 8765 --latency 0.05 --requests-per-second 5
+"""
+
+import argparse
+import json
+import random
+import string
+import threading
+import time
+import xml.etree.ElementTree as ET
+from functools import partial
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Any, Dict, List, Callable, Tuple
+
+from pymechturk.config import Local
+
+TARGET_PREFIX = "MTurkRequesterServiceV20170117."
+
+ANSWERS_NAMESPACE = \
+    "http://mechanicalturk.amazonaws.com/AWSMechanicalTurkDataSchemas/2005-10-01/QuestionFormAnswers.xsd"
+
+
+class LocalServiceError(Exception):
+    """The error returned to the client, the code is the botocore ClientError code"""
+
+    def __init__(self, code: str, message: str, status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+class _RateLimiter(object):
+    """Token bucket which rejects the requests above the rate instead of waiting"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class LocalMTurkServer(object):
+    """In-memory MTurk requester API served on the localhost"""
+
+    def __init__(self, host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.0,
+                 latency_jitter: float = 0.0,
+                 requests_per_second: Optional[float] = None,
+                 burst: Optional[float] = None,
+                 error_rate: float = 0.0,
+                 assignments_per_hit: int = 0,
+                 page_size: int = 10,
+                 seed: Optional[int] = None):
+        """
+        Create new server, it accepts the requests after start.
+
+        Args:
+            host (str): The interface to listen on
+            port (int): The port to listen on. If 0 a free port is chosen, see environment
+            latency (float): The delay of every response in seconds
+            latency_jitter (float): The upper bound of the random delay added to the latency in seconds
+            requests_per_second (Optional[float]): The allowed request rate, the requests above it are rejected with
+                ThrottlingException. If None the requests are not throttled
+            burst (Optional[float]): Number of requests allowed at once. If None it equals requests_per_second
+            error_rate (float): Probability of the ServiceFault response to any request
+            assignments_per_hit (int): Number of the submitted assignments generated for every created HIT, at most
+                its MaxAssignments. The answers are generated from the QuestionForm of the HIT
+            page_size (int): Default MaxResults of the list operations
+            seed (Optional[int]): Seed of the generated identifiers, answers and injected faults
+        """
+        assert 0 <= error_rate <= 1, f"error_rate should be in [0, 1], received {error_rate}"
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.assignments_per_hit = assignments_per_hit
+        self.page_size = page_size
+        self.stats: Dict[str, int] = {"requests": 0, "throttled": 0, "errors": 0}
+        self._rate_limiter = _RateLimiter(requests_per_second, burst) if requests_per_second else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self._hits: Dict[str, Dict[str, Any]] = dict()
+        self._assignments: Dict[str, List[Dict[str, Any]]] = dict()
+        self._qualification_types: Dict[str, Dict[str, Any]] = dict()
+        self._qualifications: Dict[str, Dict[str, Dict[str, Any]]] = dict()
+        self._operations: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "CreateHIT": self._create_hit,
+            "GetHIT": self._get_hit,
+            "ListHITs": self._list_hits,
+            "DeleteHIT": self._delete_hit,
+            "ListAssignmentsForHIT": self._list_assignments_for_hit,
+            "ApproveAssignment": partial(self._set_assignment_status, status="Approved"),
+            "RejectAssignment": partial(self._set_assignment_status, status="Rejected"),
+            "CreateQualificationType": self._create_qualification_type,
+            "GetQualificationType": self._get_qualification_type,
+            "ListQualificationTypes": self._list_qualification_types,
+            "AssociateQualificationWithWorker": self._associate_qualification_with_worker,
+            "DisassociateQualificationFromWorker": self._disassociate_qualification_from_worker,
+            "ListWorkersWithQualificationType": self._list_workers_with_qualification_type,
+            "ListQualificationRequests": self._list_qualification_requests,
+            "GetAccountBalance": self._get_account_balance,
+        }
+
+    def __enter__(self) -> "LocalMTurkServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def environment(self) -> Local:
+        """The environment for pymechturk.requester.create_client"""
+        return Local(endpoint=self.url, preview=f"{self.url}/preview")
+
+    def start(self) -> "LocalMTurkServer":
+        """Serve the requests in the background thread"""
+        assert self._server is None, "The server is already started"
+        handler = type("Handler", (_RequestHandler,), {"mturk": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def handle(self, operation: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process one request, the faults are injected here. It can be called in-process without the HTTP server.
+
+        Args:
+            operation (str): The API operation name, e.g. 'CreateHIT'
+            request (Dict[str, Any]): The request parameters
+
+        Returns:
+            Dict[str, Any]: The response
+
+        Raises:
+            LocalServiceError: The error response
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + (self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if self._rate_limiter is not None and not self._rate_limiter.try_acquire():
+            self._count("throttled")
+            raise LocalServiceError("ThrottlingException", "Rate exceeded")
+        if failed:
+            self._count("errors")
+            raise LocalServiceError("ServiceFault", "Injected service fault", status=500)
+        method = self._operations.get(operation)
+        if method is None:
+            raise LocalServiceError("UnknownOperationException", f"The operation {operation} is not supported")
+        with self._lock:
+            return method(request)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _new_id(self, length: int = 30) -> str:
+        return "".join(self._random.choices(string.ascii_uppercase + string.digits, k=length))
+
+    def _page(self, request: Dict[str, Any], items: List[Any], key: str) -> Dict[str, Any]:
+        """The page of the items, NextToken is the offset of the next page"""
+        start = int(request.get("NextToken") or 0)
+        end = start + int(request.get("MaxResults") or self.page_size)
+        response = {"NumResults": len(items[start:end]), key: items[start:end]}
+        if end < len(items):
+            response["NextToken"] = str(end)
+        return response
+
+    @staticmethod
+    def _require(request: Dict[str, Any], *names: str):
+        for name in names:
+            if name not in request:
+                raise LocalServiceError("ValidationException", f"Missing required parameter {name}")
+
+    def _create_hit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "LifetimeInSeconds", "AssignmentDurationInSeconds", "Reward", "Title", "Description")
+        if "Question" not in request and "HITLayoutId" not in request:
+            raise LocalServiceError("ParameterValidationError", "Neither Question nor HITLayoutId is provided")
+        now = time.time()
+        max_assignments = request.get("MaxAssignments", 1)
+        hit = {
+            "HITId": self._new_id(),
+            "HITTypeId": self._new_id(),
+            "HITGroupId": self._new_id(),
+            "CreationTime": now,
+            "Title": request["Title"],
+            "Description": request["Description"],
+            "Question": request.get("Question", ""),
+            "Keywords": request.get("Keywords", ""),
+            "HITStatus": "Assignable",
+            "MaxAssignments": max_assignments,
+            "Reward": request["Reward"],
+            "AutoApprovalDelayInSeconds": request.get("AutoApprovalDelayInSeconds", 2592000),
+            "Expiration": now + request["LifetimeInSeconds"],
+            "AssignmentDurationInSeconds": request["AssignmentDurationInSeconds"],
+            "QualificationRequirements": request.get("QualificationRequirements", list()),
+            "HITReviewStatus": "NotReviewed",
+            "NumberOfAssignmentsPending": 0,
+            "NumberOfAssignmentsAvailable": max_assignments,
+            "NumberOfAssignmentsCompleted": 0,
+        }
+        if "RequesterAnnotation" in request:
+            hit["RequesterAnnotation"] = request["RequesterAnnotation"]
+        self._hits[hit["HITId"]] = hit
+        self._assignments[hit["HITId"]] = [self._new_assignment(hit) for _ in
+                                           range(min(self.assignments_per_hit, max_assignments))]
+        hit["NumberOfAssignmentsAvailable"] -= len(self._assignments[hit["HITId"]])
+        return {"HIT": hit}
+
+    def _new_assignment(self, hit: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "AssignmentId": self._new_id(),
+            "WorkerId": "A" + self._new_id(13),
+            "HITId": hit["HITId"],
+            "AssignmentStatus": "Submitted",
+            "AutoApprovalTime": now + hit["AutoApprovalDelayInSeconds"],
+            "AcceptTime": now,
+            "SubmitTime": now,
+            "Deadline": now + hit["AssignmentDurationInSeconds"],
+            "Answer": self._new_answer(hit["Question"]),
+        }
+
+    def _new_answer(self, question_form: str) -> str:
+        """QuestionFormAnswers with a random selection or the text 'answer' for every question of the form"""
+        answers: List[Tuple[str, str, str]] = list()
+        try:
+            form = ET.fromstring(question_form)
+        except ET.ParseError:
+            form = None
+        if form is not None:
+            for question in form.iter():
+                if question.tag.rpartition("}")[2] != "Question":
+                    continue
+                question_id, selections = "", list()
+                for element in question.iter():
+                    tag = element.tag.rpartition("}")[2]
+                    if tag == "QuestionIdentifier":
+                        question_id = element.text or ""
+                    elif tag == "SelectionIdentifier":
+                        selections.append(element.text or "")
+                if selections:
+                    answers.append((question_id, "SelectionIdentifier", self._random.choice(selections)))
+                else:
+                    answers.append((question_id, "FreeText", "answer"))
+        if not answers:
+            answers.append(("answer", "FreeText", "answer"))
+
+        root = ET.Element("QuestionFormAnswers", xmlns=ANSWERS_NAMESPACE)
+        for question_id, tag, value in answers:
+            answer = ET.SubElement(root, "Answer")
+            ET.SubElement(answer, "QuestionIdentifier").text = question_id
+            ET.SubElement(answer, tag).text = value
+        return '<?xml version="1.0" encoding="UTF-8"?>' + ET.tostring(root, encoding="unicode")
+
+    def _hit(self, hit_id: str) -> Dict[str, Any]:
+        if hit_id not in self._hits:
+            raise LocalServiceError("RequestError", f"Hit {hit_id} does not exist.")
+        return self._hits[hit_id]
+
+    def _get_hit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "HITId")
+        return {"HIT": self._hit(request["HITId"])}
+
+    def _list_hits(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self._page(request, list(self._hits.values()), "HITs")
+
+    def _delete_hit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "HITId")
+        self._hit(request["HITId"])
+        del self._hits[request["HITId"]]
+        del self._assignments[request["HITId"]]
+        return dict()
+
+    def _list_assignments_for_hit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "HITId")
+        self._hit(request["HITId"])
+        statuses = request.get("AssignmentStatuses")
+        assignments = [a for a in self._assignments[request["HITId"]]
+                       if not statuses or a["AssignmentStatus"] in statuses]
+        return self._page(request, assignments, "Assignments")
+
+    def _set_assignment_status(self, request: Dict[str, Any], status: str) -> Dict[str, Any]:
+        self._require(request, "AssignmentId")
+        for assignments in self._assignments.values():
+            for assignment in assignments:
+                if assignment["AssignmentId"] != request["AssignmentId"]:
+                    continue
+                if assignment["AssignmentStatus"] != "Submitted" and not request.get("OverrideRejection"):
+                    raise LocalServiceError("RequestError", f"This operation can be called with a status of: "
+                                                            f"Submitted, received {assignment['AssignmentStatus']}")
+                assignment["AssignmentStatus"] = status
+                assignment["ApprovalTime" if status == "Approved" else "RejectionTime"] = time.time()
+                if "RequesterFeedback" in request:
+                    assignment["RequesterFeedback"] = request["RequesterFeedback"]
+                return dict()
+        raise LocalServiceError("RequestError", f"Assignment {request['AssignmentId']} does not exist.")
+
+    def _create_qualification_type(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "Name", "Description", "QualificationTypeStatus")
+        if any(q["Name"] == request["Name"] for q in self._qualification_types.values()):
+            raise LocalServiceError("RequestError", "You have already created a QualificationType with this name. "
+                                                    "A QualificationType's name must be unique among all of the "
+                                                    "QualificationTypes created by the same user.")
+        if "AnswerKey" in request and "Test" not in request:
+            raise LocalServiceError("RequestError", "AnswerKey requires the Test")
+        qualification = dict(request, QualificationTypeId=self._new_id(), CreationTime=time.time())
+        qualification.setdefault("IsRequestable", "Test" in request)
+        qualification.setdefault("AutoGranted", False)
+        self._qualification_types[qualification["QualificationTypeId"]] = qualification
+        self._qualifications[qualification["QualificationTypeId"]] = dict()
+        return {"QualificationType": qualification}
+
+    def _qualification_type(self, qualification_type_id: str) -> Dict[str, Any]:
+        if qualification_type_id not in self._qualification_types:
+            raise LocalServiceError("RequestError", f"QualificationType {qualification_type_id} does not exist.")
+        return self._qualification_types[qualification_type_id]
+
+    def _get_qualification_type(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "QualificationTypeId")
+        return {"QualificationType": self._qualification_type(request["QualificationTypeId"])}
+
+    def _list_qualification_types(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        query = request.get("Query", "").lower()
+        qualifications = [q for q in self._qualification_types.values() if query in q["Name"].lower()]
+        return self._page(request, qualifications, "QualificationTypes")
+
+    def _associate_qualification_with_worker(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "QualificationTypeId", "WorkerId")
+        self._qualification_type(request["QualificationTypeId"])
+        self._qualifications[request["QualificationTypeId"]][request["WorkerId"]] = {
+            "QualificationTypeId": request["QualificationTypeId"],
+            "WorkerId": request["WorkerId"],
+            "GrantTime": time.time(),
+            "IntegerValue": request.get("IntegerValue", 1),
+            "Status": "Granted",
+        }
+        return dict()
+
+    def _disassociate_qualification_from_worker(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "QualificationTypeId", "WorkerId")
+        self._qualification_type(request["QualificationTypeId"])
+        if self._qualifications[request["QualificationTypeId"]].pop(request["WorkerId"], None) is None:
+            raise LocalServiceError("RequestError", f"Worker {request['WorkerId']} does not have the qualification "
+                                                    f"{request['QualificationTypeId']}.")
+        return dict()
+
+    def _list_workers_with_qualification_type(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._require(request, "QualificationTypeId")
+        self._qualification_type(request["QualificationTypeId"])
+        qualifications = list(self._qualifications[request["QualificationTypeId"]].values())
+        return self._page(request, qualifications, "Qualifications")
+
+    def _list_qualification_requests(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self._page(request, list(), "QualificationRequests")
+
+    @staticmethod
+    def _get_account_balance(request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"AvailableBalance": "10000.00"}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """The JSON 1.1 protocol of the AWS services: the operation is in the X-Amz-Target header"""
+
+    mturk: LocalMTurkServer
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        operation = self.headers.get("X-Amz-Target", "")
+        try:
+            if not operation.startswith(TARGET_PREFIX):
+                raise LocalServiceError("UnknownOperationException", f"Unknown target {operation!r}")
+            response = self.mturk.handle(operation[len(TARGET_PREFIX):], json.loads(body or b"{}"))
+            self._respond(200, response)
+        except LocalServiceError as error:
+            self._respond(error.status, {"__type": error.code, "Message": error.message})
+        except (ValueError, KeyError, TypeError) as error:
+            self._respond(400, {"__type": "ValidationException", "Message": str(error)})
+
+    def _respond(self, status: int, response: Dict[str, Any]):
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("x-amzn-RequestId", "local")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        """The access log is not written, the server is used under load"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in of the MTurk requester API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--requests-per-second", type=float, default=None)
+    parser.add_argument("--burst", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--assignments-per-hit", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = LocalMTurkServer(args.host, args.port, args.latency, args.latency_jitter, args.requests_per_second,
+                              args.burst, args.error_rate, args.assignments_per_hit, seed=args.seed).start()
+    print(f"Serving the MTurk requester API on {server.url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
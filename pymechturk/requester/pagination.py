@@ -0,0 +1,154 @@
+"""
+Prefetching iterators over the paginated MTurk list operations.
+
+The next pages are requested by a background thread while the caller consumes the current one. The number of
+prefetched pages is bounded, and the iteration can be resumed from the saved token after a crash.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from queue import Queue, Full
+from typing import Optional, Any, Dict, List, Iterable, Iterator, Tuple
+
+from pymechturk.requester.client import call_with_retry
+
+
+class PageIterator(object):
+    """Iterator over the items of the paginated list operation"""
+
+    def __init__(self, client: Any,
+                 operation: str,
+                 result_key: str,
+                 next_token: Optional[str] = None,
+                 prefetch: int = 2,
+                 page_size: int = 100,
+                 **kwargs):
+        """
+        Create new iterator.
+
+        Args:
+            client (MTurk.Client): The boto3 MTurk client
+            operation (str): The boto3 method name, e.g. 'list_hits'
+            result_key (str): The response key with the items, e.g. 'HITs'
+            next_token (Optional[str]): The token to resume the iteration from, see resume_token
+            prefetch (int): Maximum number of pages requested ahead of the consumed one
+            page_size (int): MaxResults of one request
+            **kwargs: The request parameters
+        """
+        assert prefetch > 0, f"prefetch should be positive, received {prefetch}"
+        self._method = getattr(client, operation)
+        self._result_key = result_key
+        self._prefetch = prefetch
+        self._kwargs = dict(kwargs, MaxResults=page_size)
+        self.resume_token = next_token
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the items. The resume_token is the token of the page being consumed (or of the next page, when the
+        current one is finished), so the resumed iteration can repeat some items of the page but never skips them.
+        """
+        pages: Queue = Queue(maxsize=self._prefetch)
+        stopped = threading.Event()
+        worker = threading.Thread(target=self._fetch, args=(self.resume_token, pages, stopped), daemon=True)
+        worker.start()
+        try:
+            while True:
+                page = pages.get()
+                if isinstance(page, Exception):
+                    raise page
+                if page is None:
+                    return
+                items, next_token = page
+                yield from items
+                self.resume_token = next_token
+        finally:
+            stopped.set()
+
+    def _fetch(self, next_token: Optional[str], pages: Queue, stopped: threading.Event):
+        try:
+            while not stopped.is_set():
+                kwargs = dict(self._kwargs, NextToken=next_token) if next_token else self._kwargs
+                response = call_with_retry(self._method, **kwargs)
+                items = response.get(self._result_key, list())
+                next_token = response.get("NextToken")
+                if items and not self._put(pages, (items, next_token), stopped):
+                    return
+                if not next_token:
+                    break
+        except Exception as error:
+            self._put(pages, error, stopped)
+            return
+        self._put(pages, None, stopped)
+
+    @staticmethod
+    def _put(pages: Queue, page: Any, stopped: threading.Event) -> bool:
+        """Wait for the free place in the queue until the consumer stops"""
+        while not stopped.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+
+def list_hits(client: Any, next_token: Optional[str] = None, prefetch: int = 2) -> PageIterator:
+    return PageIterator(client, "list_hits", "HITs", next_token, prefetch)
+
+
+def list_assignments_for_hit(client: Any,
+                             hit_id: str,
+                             statuses: Optional[List[str]] = None,
+                             next_token: Optional[str] = None,
+                             prefetch: int = 2) -> PageIterator:
+    kwargs = dict(AssignmentStatuses=statuses) if statuses else dict()
+    return PageIterator(client, "list_assignments_for_hit", "Assignments", next_token, prefetch, HITId=hit_id,
+                        **kwargs)
+
+
+def list_qualification_requests(client: Any,
+                                qualification_type_id: Optional[str] = None,
+                                next_token: Optional[str] = None,
+                                prefetch: int = 2) -> PageIterator:
+    kwargs = dict(QualificationTypeId=qualification_type_id) if qualification_type_id else dict()
+    return PageIterator(client, "list_qualification_requests", "QualificationRequests", next_token, prefetch,
+                        **kwargs)
+
+
+def list_assignments_for_hits(client: Any,
+                              hit_ids: Iterable[str],
+                              statuses: Optional[List[str]] = None,
+                              max_workers: int = 8) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Harvest the assignments of many HITs in parallel. The HITs are read from the iterable lazily and at most
+    max_workers of them are harvested at once.
+
+    Args:
+        client (MTurk.Client): The boto3 MTurk client, its connection pool should have at least max_workers connections
+        hit_ids (Iterable[str]): The HIT identifiers
+        statuses (Optional[List[str]]): The assignment statuses filter
+        max_workers (int): Number of HITs harvested at once
+
+    Returns:
+        Iterator[Tuple[str, Dict[str, Any]]]: The HIT identifier and the assignment, grouped by HIT
+    """
+    def harvest(hit_id: str) -> List[Dict[str, Any]]:
+        return list(PageIterator(client, "list_assignments_for_hit", "Assignments", prefetch=1, HITId=hit_id,
+                                 **(dict(AssignmentStatuses=statuses) if statuses else dict())))
+
+    iterator = iter(hit_ids)
+    pending: Dict[Future, str] = dict()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while len(pending) < max_workers:
+                hit_id = next(iterator, None)
+                if hit_id is None:
+                    break
+                pending[executor.submit(harvest, hit_id)] = hit_id
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                hit_id = pending.pop(future)
+                for assignment in future.result():
+                    yield hit_id, assignment
@@ -0,0 +1,271 @@
+"""
+Persistent cache of the created qualification types.
+
+The qualification type is keyed by the hash of its CreateQualificationType parameters, the Test and AnswerKey are
+canonicalized first, so the same test written with a different formatting has the same key. The cache is a SQLite
+database, which can be shared by many processes: the first process which misses the key claims it, and the others
+wait for the created type instead of creating a duplicate.
+
+    cache = QualificationTypeCache("qualifications.sqlite")
+    qualification = cache.get_or_create(qualification, create, scope=client_scope)
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from copy import copy
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Optional, Callable, Any, Dict, Iterator, Tuple
+
+from pymechturk.qualification.data_classes import QualificationType
+
+# The fields which define the qualification type, IsRequestable is not a request parameter
+KEY_FIELDS = ("Name", "Description", "Keywords", "AutoGranted", "AutoGrantedValue", "Test", "AnswerKey",
+              "TestDurationInSeconds", "RetryDelayInSeconds", "QualificationTypeStatus")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qualification_types (
+    key TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    qualification_type_id TEXT,
+    creation_time REAL,
+    stored_at REAL NOT NULL,
+    claim TEXT,
+    PRIMARY KEY (key, scope)
+)
+"""
+
+
+def _canonical_xml(text: Optional[str]) -> Any:
+    """
+    The parsed document as the nested lists of the tag, the sorted attributes, the stripped text and tail and the
+    children, so the formatting whitespace, the attribute order and the namespace prefixes do not change it. The text
+    itself if it is not XML.
+    """
+    if not text:
+        return text
+    try:
+        return _canonical_element(ET.fromstring(text))
+    except ET.ParseError:
+        return text
+
+
+def _canonical_element(element: ET.Element) -> list:
+    return [element.tag, sorted(element.attrib.items()), (element.text or "").strip(), (element.tail or "").strip(),
+            [_canonical_element(child) for child in element]]
+
+
+def qualification_key(qualification: QualificationType) -> str:
+    """
+    Get the content hash of the qualification type.
+
+    Args:
+        qualification (QualificationType): The qualification type, its QualificationTypeId and CreationTime are ignored
+
+    Returns:
+        str: The SHA-256 hex digest of the canonical request parameters
+    """
+    fields = asdict(qualification)
+    canonical: Dict[str, Any] = {name: fields[name] for name in KEY_FIELDS}
+    canonical["Test"] = _canonical_xml(canonical["Test"])
+    canonical["AnswerKey"] = _canonical_xml(canonical["AnswerKey"])
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class QualificationTypeCache(object):
+    """Content-addressed SQLite cache of QualificationTypeId and CreationTime"""
+
+    def __init__(self, path: str,
+                 max_age: Optional[float] = None,
+                 claim_timeout: float = 60.0,
+                 poll_interval: float = 0.1,
+                 timeout: float = 30.0):
+        """
+        Open the cache, the database is created if it does not exist.
+
+        Args:
+            path (str): The database file, shared by the processes
+            max_age (Optional[float]): The entries stored more than max_age seconds ago are stale, they are evicted
+                and the type is created again with the same Name. MTurk rejects the duplicate Name of the existing
+                type, so max_age is only for the types which are deleted after max_age, e.g. by a cleanup job. If
+                None the entries never become stale
+            claim_timeout (float): The claim of the process which creates the type expires after claim_timeout
+                seconds, e.g. if the process crashed, and the type can be created by another process
+            poll_interval (float): The interval of checking the claimed entry in seconds
+            timeout (float): The timeout of the database lock in seconds
+        """
+        self.path = path
+        self.max_age = max_age
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """New connection for every operation, so the cache can be used from any thread and after fork"""
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def get(self, qualification: QualificationType, scope: str = "") -> Optional[QualificationType]:
+        """
+        Get the created qualification type.
+
+        Args:
+            qualification (QualificationType): The qualification type to look up
+            scope (str): The account and the endpoint of the type, the same type is created in every scope separately
+
+        Returns:
+            Optional[QualificationType]: The copy of the qualification type with QualificationTypeId and CreationTime,
+                None if it is not cached or the entry is stale
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM qualification_types WHERE key = ? AND scope = ?",
+                                     (qualification_key(qualification), scope)).fetchone()
+        if row is None or row["qualification_type_id"] is None or self._is_stale(row, time.time()):
+            return None
+        return self._restore(qualification, row)
+
+    def get_or_create(self, qualification: QualificationType,
+                      create: Callable[[QualificationType], QualificationType],
+                      scope: str = "") -> QualificationType:
+        """
+        Get the cached qualification type or create it. If another process is creating the same type, wait for it.
+
+        Args:
+            qualification (QualificationType): The qualification type without QualificationTypeId
+            create (Callable[[QualificationType], QualificationType]): Creates the type, e.g. by the
+                CreateQualificationType call, and returns it with QualificationTypeId and CreationTime
+            scope (str): The account and the endpoint of the type
+
+        Returns:
+            QualificationType: The qualification type with QualificationTypeId and CreationTime
+        """
+        cached, claim = self.claim(qualification, scope)
+        if cached is not None:
+            return cached
+        try:
+            created = create(qualification)
+        except BaseException:
+            self.release(qualification, claim, scope)
+            raise
+        self.store(created, claim, scope)
+        return created
+
+    def claim(self, qualification: QualificationType,
+              scope: str = "") -> Tuple[Optional[QualificationType], Optional[str]]:
+        """
+        Get the cached qualification type or claim its creation. The caller of the claimed type should store the
+        created type or release the claim with the returned claim token.
+
+        Args:
+            qualification (QualificationType): The qualification type without QualificationTypeId
+            scope (str): The account and the endpoint of the type
+
+        Returns:
+            Tuple[Optional[QualificationType], Optional[str]]: The cached qualification type and None, or None and
+                the claim token if the creation is claimed by the caller
+        """
+        key = qualification_key(qualification)
+        while True:
+            with self._connect() as connection:
+                # The write lock is taken before reading, so only one process can claim the key
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute("SELECT * FROM qualification_types WHERE key = ? AND scope = ?",
+                                             (key, scope)).fetchone()
+                    now = time.time()
+                    if row is not None and row["qualification_type_id"] is not None and not self._is_stale(row, now):
+                        return self._restore(qualification, row), None
+                    if row is None or row["claim"] is None or now - row["stored_at"] > self.claim_timeout:
+                        claim = uuid.uuid4().hex
+                        connection.execute(
+                            "INSERT OR REPLACE INTO qualification_types "
+                            "(key, scope, name, qualification_type_id, creation_time, stored_at, claim) "
+                            "VALUES (?, ?, ?, NULL, NULL, ?, ?)",
+                            (key, scope, qualification.Name, now, claim))
+                        return None, claim
+                finally:
+                    connection.execute("COMMIT")
+            time.sleep(self.poll_interval)
+
+    def store(self, qualification: QualificationType, claim: str, scope: str = "") -> bool:
+        """
+        Store the created qualification type in place of the claim.
+
+        Args:
+            qualification (QualificationType): The created qualification type with QualificationTypeId
+            claim (str): The claim token returned by claim
+            scope (str): The account and the endpoint of the type
+
+        Returns:
+            bool: False if the claim expired and was taken over by another process, the entry is left to it then
+        """
+        assert qualification.QualificationTypeId, "The qualification type should have QualificationTypeId"
+        creation_time = qualification.CreationTime.timestamp() if qualification.CreationTime else None
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE qualification_types SET qualification_type_id = ?, creation_time = ?, stored_at = ?, "
+                "claim = NULL WHERE key = ? AND scope = ? AND claim = ?",
+                (qualification.QualificationTypeId, creation_time, time.time(), qualification_key(qualification),
+                 scope, claim)).rowcount > 0
+
+    def release(self, qualification: QualificationType, claim: str, scope: str = ""):
+        """Remove the claim of the type which was not created, the claim taken over by another process is kept"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM qualification_types WHERE key = ? AND scope = ? AND claim = ?",
+                               (qualification_key(qualification), scope, claim))
+
+    def invalidate(self, qualification: QualificationType, scope: str = ""):
+        """Remove the entry, e.g. after the type was deleted"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM qualification_types WHERE key = ? AND scope = ?",
+                               (qualification_key(qualification), scope))
+
+    def evict_stale(self) -> int:
+        """
+        Remove the stale entries and the expired claims.
+
+        Returns:
+            int: Number of the removed entries
+        """
+        now = time.time()
+        with self._connect() as connection:
+            removed = connection.execute("DELETE FROM qualification_types WHERE claim IS NOT NULL AND stored_at < ?",
+                                         (now - self.claim_timeout,)).rowcount
+            if self.max_age is not None:
+                removed += connection.execute("DELETE FROM qualification_types WHERE claim IS NULL AND stored_at < ?",
+                                              (now - self.max_age,)).rowcount
+        return removed
+
+    def __len__(self):
+        """Get number of the created types in the cache"""
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM qualification_types WHERE qualification_type_id IS NOT NULL").fetchone()[0]
+
+    def _is_stale(self, row: sqlite3.Row, now: float) -> bool:
+        return self.max_age is not None and now - row["stored_at"] > self.max_age
+
+    @staticmethod
+    def _restore(qualification: QualificationType, row: sqlite3.Row) -> QualificationType:
+        creation_time = datetime.fromtimestamp(row["creation_time"], timezone.utc) \
+            if row["creation_time"] is not None else None
+        # The copy is not validated again
+        restored = copy(qualification)
+        restored.QualificationTypeId = row["qualification_type_id"]
+        restored.CreationTime = creation_time
+        return restored
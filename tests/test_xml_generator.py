@@ -0,0 +1,24 @@
+import copy
+import pickle
+import unittest
+
+from pymechturk.qualification.xml_generator import Slot, Content, Question, QuestionForm, SelectionAnswer
+
+
+class SlotTest(unittest.TestCase):
+    def test_pickle_round_trip(self):
+        for slot in (Slot("image_url"), Slot("image_url", "extension")):
+            restored = pickle.loads(pickle.dumps(slot))
+            self.assertEqual(restored, slot)
+            self.assertEqual((restored.name, restored.derivation), (slot.name, slot.derivation))
+            self.assertEqual(copy.copy(slot), slot)
+            self.assertEqual(copy.deepcopy(slot).derivation, slot.derivation)
+
+    def test_pickle_form_with_slots(self):
+        content = Content().add_text(Slot("text")).add_image(Slot("image_url"), "image")
+        form = QuestionForm().add_question(Question(content, SelectionAnswer({"a": "A", "b": "B"}), question_id="q"))
+        self.assertEqual(pickle.loads(pickle.dumps(form)).to_string(), form.to_string())
+
+
+if __name__ == "__main__":
+    unittest.main()